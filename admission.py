@@ -0,0 +1,87 @@
+import math
+import time
+from threading import Lock
+
+
+class Ticket:
+    """A request's slot in its lane; release() gives it back (once)"""
+
+    def __init__(self, lane):
+        self.lane = lane
+        self.start = time.monotonic()
+        self._released = False
+
+    def release(self):
+        with self.lane._lock:
+            if self._released:
+                return
+            self._released = True
+        self.lane._leave(time.monotonic() - self.start)
+
+
+class Lane:
+    """Requests of one size class; at most limit of them run at a time.
+
+    Keeps a moving average of how long its requests hold their slot, which
+    is what a rejected client is told to wait before retrying.
+    """
+
+    # Weight of the latest request in the moving average of slot time
+    SMOOTHING = 0.2
+
+    def __init__(self, name, limit, on_change=None):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.average_seconds = 1.0
+        self._on_change = on_change
+        self._lock = Lock()
+
+    def try_enter(self):
+        """A Ticket, or None when every slot is taken"""
+        with self._lock:
+            if self.active >= self.limit:
+                return None
+            self.active += 1
+            self._changed()
+        return Ticket(self)
+
+    def _leave(self, seconds):
+        with self._lock:
+            self.active -= 1
+            self.average_seconds += self.SMOOTHING * (seconds - self.average_seconds)
+            self._changed()
+
+    def _changed(self):
+        # Called with the lock held, so updates arrive in order
+        if self._on_change:
+            self._on_change(self)
+
+    def retry_after(self):
+        """Whole seconds until a slot is likely free again (1 to 300)"""
+        with self._lock:
+            return min(300, max(1, math.ceil(self.average_seconds)))
+
+
+class AdmissionControl:
+    """Sorts requests into a small and a large lane by estimated cost.
+
+    The cost of a request is its upload size plus a fixed allowance per
+    file (each file is parsed and rendered on its own). Requests costing
+    large_cost or more go to the large lane, so a few big batches can
+    neither use up every server thread nor hold up single-file requests.
+    """
+
+    def __init__(self, small_limit, large_limit, large_cost, file_cost, on_change=None):
+        self.large_cost = large_cost
+        self.file_cost = file_cost
+        self.small = Lane("small", small_limit, on_change)
+        self.large = Lane("large", large_limit, on_change)
+
+    def estimate(self, upload_bytes, file_count):
+        return upload_bytes + file_count * self.file_cost
+
+    def lane(self, upload_bytes, file_count):
+        if self.estimate(upload_bytes, file_count) >= self.large_cost:
+            return self.large
+        return self.small
@@ -1,18 +1,50 @@
-import io
+import logging
 import os
-import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import pandas as pd
-from flask import Flask, jsonify, render_template, request, send_file
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    send_file,
+    url_for,
+)
 from werkzeug.utils import secure_filename
 
+from admission import AdmissionControl
+from jobs import JobQueue
+from metrics import (
+    LANE_ACTIVE,
+    LANE_REJECTIONS,
+    REGISTRY,
+    RETENTION_BYTES,
+    RETENTION_FILES,
+    STAGE_SECONDS,
+    record_conversion,
+    timed,
+)
+from pdf_cache import PdfCache, upload_digest
+from retention import RetentionManager
+from sheet_cache import SheetCache
+from zipstream import stream_zip
+
+# converter (pandas, openpyxl, reportlab) is imported by the functions that
+# convert, so starting the app and serving the page stay light
+
+# DEBUG also logs request details; INFO logs one line per converted file
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "WARNING").upper()
+logging.basicConfig(
+    level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s %(message)s"
+)
+log = logging.getLogger(__name__)
+
 app = Flask(__name__)
 UPLOAD_FOLDER = "uploads"
 OUTPUT_FOLDER = "output"
@@ -21,16 +53,428 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {"xlsx", "xls", "csv"}
 
+# Largest request body accepted, uploads included (larger ones get a 413)
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", "100"))
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 2**20
+
+# Admission control: a request's cost is its upload size plus FILE_COST_KB
+# per file; costing LARGE_REQUEST_MB or more puts it in the large lane. Each
+# lane runs (or queues as jobs) at most this many conversions at once
+SMALL_LANE_SLOTS = int(os.environ.get("SMALL_LANE_SLOTS", "4"))
+LARGE_LANE_SLOTS = int(os.environ.get("LARGE_LANE_SLOTS", "1"))
+LARGE_REQUEST_MB = int(os.environ.get("LARGE_REQUEST_MB", "8"))
+FILE_COST_KB = int(os.environ.get("FILE_COST_KB", "512"))
+
+# /convert reads uploads from the request instead of saving them to uploads/
+IN_MEMORY_UPLOADS = os.environ.get("IN_MEMORY_UPLOADS", "1") == "1"
+
+# Also keep a copy of every /convert PDF in output/ (written in the background)
+PERSIST_OUTPUT = os.environ.get("PERSIST_OUTPUT", "0") == "1"
+
+# Size limit of the rendered PDF cache in output/cache (0 disables it)
+PDF_CACHE_MAX_MB = int(os.environ.get("PDF_CACHE_MAX_MB", "256"))
+
+pdf_cache = PdfCache(os.path.join(OUTPUT_FOLDER, "cache"), PDF_CACHE_MAX_MB * 2**20)
+
+# Parsed uploads kept in memory for re-rendering with other report options:
+# size limit (0 disables it) and seconds an unused upload is kept
+SHEET_CACHE_MAX_MB = int(os.environ.get("SHEET_CACHE_MAX_MB", "128"))
+SHEET_CACHE_TTL = int(os.environ.get("SHEET_CACHE_TTL", "1800"))
+
+sheet_cache = SheetCache(SHEET_CACHE_MAX_MB * 2**20, SHEET_CACHE_TTL)
+
+# Background conversions started through /jobs/...: worker threads, and how
+# long finished results stay downloadable (seconds)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_TTL = int(os.environ.get("JOB_TTL", "3600"))
+JOBS_FOLDER = os.path.join(OUTPUT_FOLDER, "jobs")
+os.makedirs(JOBS_FOLDER, exist_ok=True)
+
+job_queue = JobQueue(JOB_WORKERS, JOB_TTL)
+
+admission = AdmissionControl(
+    SMALL_LANE_SLOTS,
+    LARGE_LANE_SLOTS,
+    LARGE_REQUEST_MB * 2**20,
+    FILE_COST_KB * 1024,
+    on_change=lambda lane: LANE_ACTIVE.set(lane.active, lane=lane.name),
+)
+
+_output_writer = ThreadPoolExecutor(max_workers=1)
+
+# Retention of uploads/ and output/ (the PDF cache and job results manage
+# their own): entries older than RETENTION_MAX_AGE seconds are deleted, then
+# the oldest until RETENTION_MAX_MB is met, checked every RETENTION_INTERVAL
+# seconds. Nothing younger than RETENTION_MIN_AGE seconds is touched
+RETENTION_MAX_AGE = int(os.environ.get("RETENTION_MAX_AGE", "86400"))
+RETENTION_MAX_MB = int(os.environ.get("RETENTION_MAX_MB", "1024"))
+RETENTION_INTERVAL = int(os.environ.get("RETENTION_INTERVAL", "300"))
+RETENTION_MIN_AGE = int(os.environ.get("RETENTION_MIN_AGE", "900"))
+
+
+def _count_deleted(folder, reason, size):
+    RETENTION_FILES.inc(folder=folder, reason=reason)
+    RETENTION_BYTES.inc(size, folder=folder, reason=reason)
+
+
+retention = RetentionManager(
+    [UPLOAD_FOLDER, OUTPUT_FOLDER],
+    RETENTION_MAX_AGE,
+    RETENTION_MAX_MB * 2**20,
+    RETENTION_INTERVAL,
+    min_age=RETENTION_MIN_AGE,
+    exclude=[pdf_cache.folder, JOBS_FOLDER],
+    on_delete=_count_deleted,
+)
+
+# Job results are swept by age alone, JOB_TTL seconds after they were
+# written. The job queue deletes the results of its own jobs, but not those
+# of another worker process, an earlier run or a failed write
+job_retention = RetentionManager(
+    [JOBS_FOLDER],
+    JOB_TTL,
+    0,
+    RETENTION_INTERVAL,
+    min_age=JOB_TTL,
+    on_delete=_count_deleted,
+)
+
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _write_output(output_path, data):
+    # Requests for the same report write the same path; each one writes its
+    # own temp file, so the last to finish wins instead of mixing bytes
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+    except OSError as e:
+        log.warning("Could not save %s: %s", output_path, e)
+        retention.remove(tmp_path)
+
+
+def _upload_path(prefix, filename):
+    """A path in uploads/ no other request uses, for a copy of filename"""
+    return os.path.join(UPLOAD_FOLDER, f"{prefix}_{uuid.uuid4().hex}_{filename}")
+
+
+def _batch_name():
+    # Unique even for batches started in the same second
+    return f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def _discard_uploads(paths):
+    """Delete saved uploads once their conversion is over"""
+    for path in paths:
+        retention.remove(path)
+
+
+def _save_upload(file, path):
+    start = time.perf_counter()
+    file.save(path)
+    # Queued jobs can wait longer than RETENTION_MIN_AGE; _discard_uploads
+    # releases the file
+    retention.pin(path)
+    # Its own stage: the "io" observations are one per conversion
+    STAGE_SECONDS.observe(time.perf_counter() - start, stage="upload")
+
+
+def _admit(file_count, hold=True):
+    """Take a slot in the lane matching this request's estimated cost.
+
+    Returns (ticket, None), or (None, error response) when the lane is
+    full. With hold, the slot is given back once the response has been
+    sent (streamed ZIPs included); otherwise the caller releases it.
+    """
+    lane = admission.lane(request.content_length or 0, file_count)
+    ticket = lane.try_enter()
+    if ticket is None:
+        LANE_REJECTIONS.inc(lane=lane.name)
+        log.info("admission lane=%s full, request rejected", lane.name)
+        # A full small lane means the server is overloaded; a full large
+        # lane only asks this (heavy) client to come back later
+        response = jsonify(
+            {"error": "The server is busy converting other files. Please retry."}
+        )
+        response.status_code = 503 if lane is admission.small else 429
+        response.headers["Retry-After"] = str(lane.retry_after())
+        return None, response
+    if hold:
+        g.admission_ticket = ticket
+    return ticket, None
+
+
+@app.after_request
+def _release_admission(response):
+    ticket = g.pop("admission_ticket", None)
+    if ticket is not None:
+        response.call_on_close(ticket.release)
+    return response
+
+
+@app.before_request
+def _start_retention():
+    # Started by the serving process: gunicorn may import the app in its
+    # master and fork the workers afterwards
+    retention.start()
+    job_retention.start()
+
+
+@app.before_request
+def _check_upload_size():
+    # Answer before the body is read rather than when a view parses it
+    limit = app.config["MAX_CONTENT_LENGTH"]
+    if request.content_length is not None and request.content_length > limit:
+        return upload_too_large(None)
+
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify(
+        {"error": f"Upload too large. The limit is {MAX_UPLOAD_MB} MB per request."}
+    ), 413
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
 
+@app.route("/cache-stats")
+def cache_stats():
+    """Hit/miss counters and size of the rendered PDF and parsed upload caches"""
+    return jsonify({**pdf_cache.stats(), "sheet_cache": sheet_cache.stats()})
+
+
+@app.route("/metrics")
+def metrics():
+    """Conversion latency histograms and counters in Prometheus text format"""
+    return Response(
+        REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+class UploadReadError(Exception):
+    """The uploaded workbook could not be read"""
+
+
+def _convert_upload(
+    source, filename, report_date, render_mode, sheet_mode, upload_id=None, parsed=None
+):
+    """Render one upload (a path or the request stream) to PDFs.
+
+    Returns (pdfs, upload_id): a list of (pdf_filename, pdf_data), one per
+    sheet when sheet_mode is "separate", and the id to re-render the upload
+    with through /uploads/<upload_id>/convert. Re-rendering passes the
+    upload's sheet_cache entry as parsed instead of a source. Raises
+    UploadReadError when the workbook cannot be read. Every call is
+    recorded in the metrics.
+    """
+    start = time.perf_counter()
+    stats = {}
+    outcome = "error"
+    pdfs = []
+    try:
+        pdfs, upload_id, outcome = _render_upload(
+            source,
+            filename,
+            report_date,
+            render_mode,
+            sheet_mode,
+            stats,
+            upload_id,
+            parsed,
+        )
+    except UploadReadError:
+        outcome = "read_error"
+        raise
+    finally:
+        record_conversion(
+            "single",
+            filename,
+            outcome,
+            time.perf_counter() - start,
+            stats,
+            sum(len(pdf_data) for _, pdf_data in pdfs),
+        )
+    return pdfs, upload_id
+
+
+def _render_upload(
+    source, filename, report_date, render_mode, sheet_mode, stats, upload_id, parsed
+):
+    """_convert_upload without the metrics; also returns the outcome"""
+    import converter
+
+    # Title includes branch name + "DAILY STAFF ATTENDANCE", subtitle is date
+    branch_name = os.path.splitext(filename)[0].upper()
+    all_sheets = sheet_mode != "first"
+
+    if upload_id is None:
+        with timed(stats, "io"):
+            upload_id = upload_digest(source)
+
+    # Same upload with the same options as before: serve the stored PDF
+    cache_key = None
+    if pdf_cache.enabled:
+        with timed(stats, "io"):
+            cache_key = converter.report_cache_key(
+                pdf_cache,
+                source,
+                filename,
+                report_date,
+                render_mode,
+                sheet_mode,
+                upload_id,
+            )
+            pdf_data = pdf_cache.get(cache_key)
+        if pdf_data is not None:
+            pdf_filename = converter.report_pdf_filename(branch_name, report_date)
+            return [(pdf_filename, pdf_data)], upload_id, "cached"
+
+    # Same upload with other report options: render the sheets parsed before
+    if parsed is None:
+        parsed = sheet_cache.get(upload_id, all_sheets)
+    if parsed is not None:
+        parsed_filename, sheets = parsed
+        if parsed_filename != filename:
+            # The same bytes under another name are another branch's file,
+            # which the attendance rules may treat differently
+            sheets = [
+                (name, converter.classify_sheet(sheet, branch_name))
+                for name, sheet in sheets
+            ]
+        stats["rows"] = sum(len(sheet) for _, sheet in sheets)
+        outcome = "reused"
+    else:
+        # Read Excel/CSV file (every sheet unless only the first is wanted)
+        try:
+            sheets = converter.read_report_sheets(source, filename, sheet_mode, stats)
+        except Exception as e:
+            raise UploadReadError(str(e)) from e
+        sheet_cache.put(upload_id, all_sheets, filename, sheets)
+        outcome = "ok"
+
+    # Generate PDFs; separate sheets render in parallel in the batch pool
+    pdfs = converter.render_attendance_pdfs(
+        sheets,
+        branch_name,
+        report_date,
+        render_mode,
+        sheet_mode,
+        stats,
+        True,
+    )
+    # Only single-PDF results fit in the cache
+    if cache_key is not None and len(pdfs) == 1:
+        with timed(stats, "io"):
+            pdf_cache.put(cache_key, pdfs[0][1])
+
+    # Keep a copy in the output folder without holding up the response
+    if PERSIST_OUTPUT:
+        for pdf_filename, pdf_data in pdfs:
+            output_path = os.path.join(OUTPUT_FOLDER, pdf_filename)
+            _output_writer.submit(_write_output, output_path, pdf_data)
+
+    return pdfs, upload_id, outcome
+
+
+def _single_download(pdfs, filename, report_date):
+    """(download filename, data, mimetype) for the PDFs of one upload
+
+    Several PDFs (one per sheet) are sent together as a ZIP.
+    """
+    import converter
+
+    if len(pdfs) == 1:
+        pdf_filename, pdf_data = pdfs[0]
+        return pdf_filename, pdf_data, "application/pdf"
+    branch_name = os.path.splitext(filename)[0].upper()
+    zip_filename = converter.report_pdf_filename(branch_name, report_date)[:-4] + ".zip"
+    return zip_filename, b"".join(stream_zip(pdfs)), "application/zip"
+
+
+def _save_batch_uploads(files, batch_name):
+    """Save batch uploads for the workers to read.
+
+    Returns (jobs, errors): jobs are (position, filepath, filename) for every
+    usable upload, errors are messages for the rest keyed by upload position.
+    """
+    errors = {}
+    jobs = []
+    for position, file in enumerate(files):
+        try:
+            if not file or not allowed_file(file.filename):
+                errors[position] = f"{file.filename}: Invalid file format"
+                continue
+
+            # Extract just the filename (remove folder paths from webkitdirectory)
+            # file.filename might be like "folder/subfolder/filename.xlsx"
+            filename = secure_filename(os.path.basename(file.filename))
+
+            # Uploads from different subfolders can share a name, so keep
+            # each saved copy distinct while the workers are reading them
+            filepath = os.path.join(
+                UPLOAD_FOLDER, f"{batch_name}_{position}_{filename}"
+            )
+            _save_upload(file, filepath)
+            jobs.append((position, filepath, filename))
+
+        except Exception as e:
+            errors[position] = f"{file.filename}: {str(e)}"
+    return jobs, errors
+
+
+def _batch_zip_entries(pdfs, batch_name):
+    """(pdf_filename, pdf_data) ZIP entries, also saved to output/ if enabled"""
+    import converter
+
+    if PERSIST_OUTPUT:
+        batch_folder = os.path.join(OUTPUT_FOLDER, batch_name)
+        os.makedirs(batch_folder, exist_ok=True)
+    for pdf_filename, pdf_data in converter.unique_pdf_filenames(pdfs):
+        if PERSIST_OUTPUT:
+            output_path = os.path.join(batch_folder, pdf_filename)
+            _output_writer.submit(_write_output, output_path, pdf_data)
+        yield pdf_filename, pdf_data
+
+
+def _summary_requested():
+    """Whether a batch request wants SUMMARY.pdf in its ZIP (summary field)"""
+    import converter
+
+    default = "1" if converter.BATCH_SUMMARY else "0"
+    return request.form.get("summary", default) == "1"
+
+
+def _report_modes():
+    """(render_mode, sheet_mode) of the request, or (None, error response)
+
+    Unknown values are refused rather than rendered with the default, which
+    would quietly give (and cache) a different report.
+    """
+    import converter
+
+    render_mode = request.form.get("render_mode", converter.RENDER_MODE)
+    sheet_mode = request.form.get("sheet_mode", converter.SHEET_MODE)
+    for field, value, allowed in (
+        ("render_mode", render_mode, converter.RENDER_MODES),
+        ("sheet_mode", sheet_mode, converter.SHEET_MODES),
+    ):
+        if value not in allowed:
+            error = f"Unknown {field} {value!r}. Allowed values: {', '.join(allowed)}."
+            return None, (jsonify({"error": error}), 400)
+    return (render_mode, sheet_mode), None
+
+
+def _batch_zip_filename():
+    return f"attendance_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+
 @app.route("/convert", methods=["POST"])
 def convert_excel_to_pdf():
     try:
@@ -39,561 +483,432 @@ def convert_excel_to_pdf():
         title = request.form.get("title", "ATTENDANCE REPORT")
         subtitle = request.form.get("subtitle", "")
         report_date = request.form.get("report_date", "")
-
-        print("=" * 60)
-        print(f"DEBUG - Report date received: '{report_date}'")
-        print(f"DEBUG - Report date type: {type(report_date)}")
-        print(f"DEBUG - Report date length: {len(report_date) if report_date else 0}")
-        print(
-            f"DEBUG - Report date stripped: '{report_date.strip() if report_date else ''}'"
+        modes, invalid = _report_modes()
+        if invalid:
+            return invalid
+        render_mode, sheet_mode = modes
+
+        log.debug(
+            "convert request file=%r report_date=%r render_mode=%s sheet_mode=%s",
+            file.filename if file else None,
+            report_date,
+            render_mode,
+            sheet_mode,
         )
-        print("=" * 60)
 
         if not file or not allowed_file(file.filename):
             return jsonify(
                 {"error": "Invalid file format. Please upload Excel or CSV files."}
             ), 400
 
-        # Save uploaded file
+        _, busy = _admit(1)
+        if busy:
+            return busy
+
         filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        if IN_MEMORY_UPLOADS:
+            # Parse straight from the request stream
+            source = file.stream
+        else:
+            # Save uploaded file
+            source = _upload_path("convert", filename)
+            _save_upload(file, source)
 
-        # Read Excel/CSV file
         try:
-            if filepath.endswith(".csv"):
-                df = pd.read_csv(filepath)
-            else:
-                # Read the Excel file without automatic header detection
-                df_raw = pd.read_excel(filepath, header=None)
-
-                # Find the header row (usually has EmployeeName)
-                header_row = 0
-                for idx, row in df_raw.iterrows():
-                    row_str = " ".join(str(v) for v in row if pd.notna(v))
-                    if "EmployeeName" in row_str or "employee" in row_str.lower():
-                        header_row = idx
-                        break
-
-                # Read with proper header
-                df = pd.read_excel(filepath, header=header_row)
-
-            # Clean up the dataframe
-            # Remove rows that are all NaN
-            df = df.dropna(how="all")
-
-            # Remove columns that are completely empty or contain "Unnamed"
-            df = df.loc[:, ~df.columns.str.contains("Unnamed", case=False, na=False)]
-
-            # Reset index
-            df = df.reset_index(drop=True)
-
-            # Remove any rows where all values are NaN
-            df = df.dropna(how="all")
-
-        except Exception as e:
+            pdfs, upload_id = _convert_upload(
+                source, filename, report_date, render_mode, sheet_mode
+            )
+        except UploadReadError as e:
             return jsonify({"error": f"Error reading file: {str(e)}"}), 400
+        finally:
+            if not IN_MEMORY_UPLOADS:
+                _discard_uploads([source])
 
-        # Generate PDF
-        pdf_buffer = io.BytesIO()
+        return _download_response(pdfs, filename, report_date, upload_id)
 
-        # Format title and subtitle - title includes branch name + "DAILY STAFF ATTENDANCE", subtitle is date
-        branch_name = os.path.splitext(filename)[0].upper()
+    except Exception as e:
+        return jsonify({"error": f"Error: {str(e)}"}), 500
 
-        # Create PDF filename with branch name and date (only if date provided)
-        print(f"DEBUG - Checking if report_date exists: {bool(report_date)}")
-        print(
-            f"DEBUG - Checking if report_date.strip() exists: {bool(report_date.strip()) if report_date else False}"
-        )
 
-        if report_date and report_date.strip():
-            try:
-                print(f"DEBUG - Attempting to parse date: '{report_date}'")
-                date_obj = datetime.strptime(report_date, "%Y-%m-%d")
-                date_str = date_obj.strftime("%d-%m-%Y")
-                pdf_filename = f"{branch_name}_{date_str}.pdf"
-                print(f"DEBUG - SUCCESS! PDF filename created: '{pdf_filename}'")
-            except Exception as e:
-                print(f"DEBUG - ERROR creating filename: {e}")
-                print(f"DEBUG - Exception type: {type(e).__name__}")
-                pdf_filename = f"{branch_name}.pdf"
-        else:
-            pdf_filename = f"{branch_name}.pdf"
-            print(
-                f"DEBUG - No valid date provided, using filename without date: '{pdf_filename}'"
-            )
-        formatted_title = f"{branch_name} DAILY STAFF ATTENDANCE"
-        formatted_subtitle = "LATE COMMERS AND ABSENTEEISM AS AT"
-        if report_date and report_date.strip():
-            try:
-                date_obj = datetime.strptime(report_date, "%Y-%m-%d")
-                formatted_subtitle = f"LATE COMMERS AND ABSENTEEISM AS AT {date_obj.strftime('%d %B %Y')}"
-            except:
-                formatted_subtitle = f"LATE COMMERS AND ABSENTEEISM AS AT {report_date}"
-
-        generate_attendance_pdf(
-            pdf_buffer, df, formatted_title, formatted_subtitle, report_date
-        )
-        pdf_buffer.seek(0)
+@app.route("/uploads/<upload_id>/convert", methods=["POST"])
+def reconvert_upload(upload_id):
+    """Render an earlier /convert upload again with other report options.
 
-        # Save to output folder first
-        output_path = os.path.join(OUTPUT_FOLDER, pdf_filename)
-        with open(output_path, "wb") as f:
-            f.write(pdf_buffer.read())
+    The upload is identified by the X-Upload-Id header of its response and
+    is not sent again; its parsed sheets are rendered with the new report
+    date, render mode and (optionally) filename, which sets the title.
+    """
+    try:
+        report_date = request.form.get("report_date", "")
+        modes, invalid = _report_modes()
+        if invalid:
+            return invalid
+        render_mode, sheet_mode = modes
 
-        print("=" * 60)
-        print(f"DEBUG - FINAL: Sending file with name: '{pdf_filename}'")
-        print(f"DEBUG - Saved to: '{output_path}'")
-        print("=" * 60)
+        parsed = sheet_cache.get(upload_id, sheet_mode != "first")
+        if parsed is None:
+            return jsonify(
+                {"error": "Unknown or expired upload. Please upload the file again."}
+            ), 404
 
-        # Read the saved file and create response with explicit headers
-        with open(output_path, "rb") as f:
-            pdf_data = f.read()
+        _, busy = _admit(1)
+        if busy:
+            return busy
 
-        from flask import Response, make_response
+        filename = parsed[0]
+        if request.form.get("filename"):
+            filename = secure_filename(request.form["filename"]) or filename
 
-        response = make_response(pdf_data)
-        response.headers["Content-Type"] = "application/pdf"
-        response.headers["Content-Disposition"] = (
-            f'attachment; filename="{pdf_filename}"'
+        pdfs, _ = _convert_upload(
+            None, filename, report_date, render_mode, sheet_mode, upload_id, parsed
         )
-        response.headers["Content-Length"] = len(pdf_data)
-        return response
+        return _download_response(pdfs, filename, report_date, upload_id)
 
     except Exception as e:
         return jsonify({"error": f"Error: {str(e)}"}), 500
 
 
+def _download_response(pdfs, filename, report_date, upload_id):
+    download_filename, data, mimetype = _single_download(pdfs, filename, report_date)
+    log.debug("convert response filename=%r bytes=%d", download_filename, len(data))
+
+    response = make_response(data)
+    response.headers["Content-Type"] = mimetype
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="{download_filename}"'
+    )
+    response.headers["Content-Length"] = len(data)
+    # Re-render with other options through /uploads/<upload_id>/convert
+    response.headers["X-Upload-Id"] = upload_id
+    return response
+
+
 @app.route("/batch-convert", methods=["POST"])
 def batch_convert_excel_to_pdf():
     """Convert multiple Excel files to PDF in batch"""
+    import converter
+    from batch_summary import BatchSummary
+
     try:
         # Get form data
         files = request.files.getlist("files[]")
         subtitle = request.form.get("subtitle", "")
         report_date = request.form.get("report_date", "")
+        modes, invalid = _report_modes()
+        if invalid:
+            return invalid
+        render_mode, sheet_mode = modes
+        summary = BatchSummary() if _summary_requested() else None
 
         if not files:
             return jsonify({"error": "No files uploaded"}), 400
 
-        # Create batch output folder
-        batch_folder = os.path.join(
-            OUTPUT_FOLDER, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        _, busy = _admit(len(files))
+        if busy:
+            return busy
+
+        batch_name = _batch_name()
+
+        # Save every upload first; the read-clean-render work runs in the pool
+        jobs, errors = _save_batch_uploads(files, batch_name)
+        saved = [filepath for _, filepath, _ in jobs]
+
+        # PDFs arrive in upload order as soon as each one is rendered
+        positions = [position for position, _, _ in jobs]
+        results = converter.convert_batch(
+            [(filepath, filename) for _, filepath, filename in jobs],
+            report_date,
+            render_mode,
+            pdf_cache,
+            sheet_mode,
+            summary,
         )
-        os.makedirs(batch_folder, exist_ok=True)
 
-        pdf_files = []
-        errors = []
-
-        for file in files:
-            try:
-                if not file or not allowed_file(file.filename):
-                    errors.append(f"{file.filename}: Invalid file format")
-                    continue
-
-                # Extract just the filename (remove folder paths from webkitdirectory)
-                # file.filename might be like "folder/subfolder/filename.xlsx"
-                filename = secure_filename(os.path.basename(file.filename))
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
-
-                # Get title from filename (without extension)
-                title = os.path.splitext(filename)[0].upper()
-
-                # Read Excel/CSV file
-                try:
-                    if filepath.endswith(".csv"):
-                        df = pd.read_csv(filepath)
-                    else:
-                        # Read the Excel file without automatic header detection
-                        df_raw = pd.read_excel(filepath, header=None)
-
-                        # Find the header row
-                        header_row = 0
-                        for idx, row in df_raw.iterrows():
-                            row_str = " ".join(str(v) for v in row if pd.notna(v))
-                            if (
-                                "EmployeeName" in row_str
-                                or "employee" in row_str.lower()
-                            ):
-                                header_row = idx
-                                break
-
-                        # Read with proper header
-                        df = pd.read_excel(filepath, header=header_row)
-
-                    # Clean up the dataframe
-                    df = df.dropna(how="all")
-                    df = df.loc[
-                        :, ~df.columns.str.contains("Unnamed", case=False, na=False)
-                    ]
-                    df = df.reset_index(drop=True)
-                    df = df.dropna(how="all")
-
-                    # Format title and subtitle - title includes branch name + "DAILY STAFF ATTENDANCE", subtitle is date
-                    branch_name = os.path.splitext(filename)[0].upper()
-                    formatted_title = f"{branch_name} DAILY STAFF ATTENDANCE"
-                    formatted_subtitle = "LATE COMMERS AND ABSENTEEISM AS AT"
-                    if report_date and report_date.strip():
-                        try:
-                            date_obj = datetime.strptime(report_date, "%Y-%m-%d")
-                            formatted_subtitle = f"LATE COMMERS AND ABSENTEEISM AS AT {date_obj.strftime('%d %B %Y')}"
-                        except:
-                            formatted_subtitle = (
-                                f"LATE COMMERS AND ABSENTEEISM AS AT {report_date}"
-                            )
-
-                    # Generate PDF
-                    pdf_buffer = io.BytesIO()
-                    generate_attendance_pdf(
-                        pdf_buffer, df, formatted_title, formatted_subtitle, report_date
-                    )
-                    pdf_buffer.seek(0)
-
-                    # Save PDF with branch name and date (only if date provided)
-                    if report_date and report_date.strip():
-                        try:
-                            date_obj = datetime.strptime(report_date, "%Y-%m-%d")
-                            date_str = date_obj.strftime("%d-%m-%Y")
-                            pdf_filename = f"{branch_name}_{date_str}.pdf"
-                        except:
-                            pdf_filename = f"{branch_name}.pdf"
-                    else:
-                        pdf_filename = f"{branch_name}.pdf"
-                    pdf_path = os.path.join(batch_folder, pdf_filename)
-
-                    with open(pdf_path, "wb") as f:
-                        f.write(pdf_buffer.read())
-
-                    pdf_files.append(pdf_path)
-
-                except Exception as e:
-                    errors.append(f"{filename}: {str(e)}")
-
-            except Exception as e:
-                errors.append(f"{file.filename}: {str(e)}")
-
-        if not pdf_files:
+        # Hold the response until the first PDF is ready, so a batch where
+        # every file fails still gets a JSON error instead of an empty ZIP
+        first_pdfs = None
+        for position, result in zip(positions, results):
+            filename, pdfs, error = result
+            if error is None:
+                first_pdfs = pdfs
+                break
+            errors[position] = f"{filename}: {error}"
+
+        if first_pdfs is None:
+            _discard_uploads(saved)
+            messages = [errors[position] for position in sorted(errors)]
             return jsonify(
-                {"error": "No PDFs were generated. " + "; ".join(errors)}
+                {"error": "No PDFs were generated. " + "; ".join(messages)}
             ), 400
 
-        # Create ZIP file
-        import zipfile
+        def pdfs():
+            yield from first_pdfs
+            for _, pdfs, error in results:
+                if error is None:
+                    yield from pdfs
+            # Every file has been counted by now
+            if summary is not None:
+                yield (
+                    converter.SUMMARY_PDF_FILENAME,
+                    converter.render_summary_pdf(summary, report_date),
+                )
 
-        zip_filename = (
-            f"attendance_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        # Stream the ZIP entry by entry instead of building it on disk
+        response = Response(
+            stream_zip(_batch_zip_entries(pdfs(), batch_name)),
+            mimetype="application/zip",
         )
-        zip_path = os.path.join(OUTPUT_FOLDER, zip_filename)
-
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for pdf_file in pdf_files:
-                arcname = os.path.basename(pdf_file)
-                zipf.write(pdf_file, arcname)
-
-        # Return ZIP file with explicit headers
-        with open(zip_path, "rb") as f:
-            zip_data = f.read()
-
-        from flask import Response, make_response
-
-        response = make_response(zip_data)
-        response.headers["Content-Type"] = "application/zip"
         response.headers["Content-Disposition"] = (
-            f'attachment; filename="{zip_filename}"'
+            f'attachment; filename="{_batch_zip_filename()}"'
         )
-        response.headers["Content-Length"] = len(zip_data)
+        # The uploads are read until the last PDF has been streamed
+        response.call_on_close(lambda: _discard_uploads(saved))
         return response
 
     except Exception as e:
         return jsonify({"error": f"Error: {str(e)}"}), 500
 
 
-def generate_attendance_pdf(pdf_buffer, df, title, subtitle, report_date=None):
-    """Generate PDF with attendance data and color coding"""
-
-    # Create PDF document
-    doc = SimpleDocTemplate(
-        pdf_buffer,
-        pagesize=letter,
-        rightMargin=0.3 * inch,
-        leftMargin=0.3 * inch,
-        topMargin=0.4 * inch,
-        bottomMargin=0.4 * inch,
-    )
+def _run_convert_job(job, source, filename, report_date, render_mode, sheet_mode):
+    job.current_file = filename
+    try:
+        pdfs, job.upload_id = _convert_upload(
+            source, filename, report_date, render_mode, sheet_mode
+        )
+    except UploadReadError as e:
+        raise UploadReadError(f"Error reading file: {str(e)}") from e
+    finally:
+        _discard_uploads([source])
+
+    download_filename, data, mimetype = _single_download(pdfs, filename, report_date)
+    extension = os.path.splitext(download_filename)[1]
+    result_path = os.path.join(JOBS_FOLDER, f"{job.id}{extension}")
+    _write_job_result(result_path, [data])
+    job.result_path = result_path
+    job.result_filename = download_filename
+    job.mimetype = mimetype
+    job.done = 1
+
+
+def _write_job_result(path, chunks):
+    """Write a job's result file, leaving nothing behind if that fails.
+
+    Only finished results get a result_path, which is what the job queue
+    deletes them by.
+    """
+    try:
+        with open(path, "wb") as f:
+            f.writelines(chunks)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
 
-    story = []
-    styles = getSampleStyleSheet()
 
-    # Try to use Calibri, fallback to Helvetica if not available
+def _run_batch_job(
+    job, jobs, errors, batch_name, report_date, render_mode, sheet_mode, with_summary
+):
     try:
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-
-        # Try to register Calibri font from Windows fonts
-        pdfmetrics.registerFont(TTFont("Calibri", "C:/Windows/Fonts/calibri.ttf"))
-        pdfmetrics.registerFont(TTFont("Calibri-Bold", "C:/Windows/Fonts/calibrib.ttf"))
-        font_name = "Calibri"
-        font_name_bold = "Calibri-Bold"
-    except:
-        # Fallback to Helvetica if Calibri is not available
-        font_name = "Helvetica"
-        font_name_bold = "Helvetica-Bold"
-
-    # Title
-    title_style = ParagraphStyle(
-        "CustomTitle",
-        parent=styles["Heading1"],
-        fontSize=14,
-        textColor=colors.HexColor("#000000"),
-        spaceAfter=2,
-        alignment=1,  # TA_CENTER = 1
-        fontName=font_name_bold,
-    )
-    story.append(Paragraph(title, title_style))
-
-    # Subtitle
-    if subtitle:
-        subtitle_style = ParagraphStyle(
-            "CustomSubtitle",
-            parent=styles["Normal"],
-            fontSize=14,
-            textColor=colors.HexColor("#000000"),
-            spaceBefore=0,
-            spaceAfter=10,
-            alignment=1,  # TA_CENTER = 1
-            fontName=font_name_bold,
+        _write_batch_result(
+            job,
+            jobs,
+            errors,
+            batch_name,
+            report_date,
+            render_mode,
+            sheet_mode,
+            with_summary,
         )
-        story.append(Paragraph(subtitle, subtitle_style))
-
-    # Select relevant columns for display
-    preferred_columns = [
-        "EmployeeName",
-        "DepartmentName",
-        "AttendanceDate",
-        "ActualCheckIn",
-        "ActualCheckOut",
-        "DayOff",
-    ]
-    display_columns = []
-
-    # Use preferred columns if they exist
-    for col in preferred_columns:
-        if col in df.columns:
-            display_columns.append(col)
-
-    # If no preferred columns found, use first 6 columns
-    if not display_columns:
-        display_columns = list(df.columns)[:6]
-
-    # Create cell styles for wrapped text
-    cell_style = ParagraphStyle(
-        "CellStyle",
-        parent=styles["Normal"],
-        fontSize=12,
-        fontName=font_name,
-        alignment=TA_CENTER,
-        leading=14,
-        wordWrap="CJK",
+    finally:
+        _discard_uploads([filepath for _, filepath, _ in jobs])
+
+
+def _write_batch_result(
+    job, jobs, errors, batch_name, report_date, render_mode, sheet_mode, with_summary
+):
+    import converter
+    from batch_summary import BatchSummary
+
+    summary = BatchSummary() if with_summary else None
+    results = converter.convert_batch(
+        [(filepath, filename) for _, filepath, filename in jobs],
+        report_date,
+        render_mode,
+        pdf_cache,
+        sheet_mode,
+        summary,
     )
 
-    cell_style_bold = ParagraphStyle(
-        "CellStyleBold",
-        parent=styles["Normal"],
-        fontSize=12,
-        fontName=font_name_bold,
-        alignment=TA_CENTER,
-        leading=14,
-        wordWrap="CJK",
-    )
-
-    # Prepare table data with Paragraph-wrapped headers
-    table_data = []
-    header_row = []
-    for col in display_columns:
-        header_row.append(Paragraph(str(col), cell_style_bold))
-    table_data.append(header_row)
-
-    # Data rows with color coding
-    header_colors = []
-
-    for idx, row in df.iterrows():
-        row_data = []
-        row_colors = []
-
-        for col in display_columns:
-            value = str(row[col]) if pd.notna(row[col]) else ""
-
-            # Color coding logic
-            cell_color = colors.white
-            text_color = colors.black
-
-            if col == "ActualCheckIn":
-                # Check for absenteeism (empty check-in)
-                if pd.isna(row[col]) or str(row[col]).strip() == "":
-                    cell_color = colors.HexColor("#FFFF00")  # Yellow for absent
-                else:
-                    # Check for late comers - compare with 08:34
-                    try:
-                        check_in_time = str(row[col]).strip()
-                        if ":" in check_in_time:
-                            # Parse time (handles both HH:MM:SS and HH:MM formats)
-                            time_parts = check_in_time.split(":")
-                            hour = int(time_parts[0])
-                            minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-
-                            # Convert to total minutes for comparison
-                            check_in_minutes = hour * 60 + minute
-                            late_threshold_minutes = 8 * 60 + 34  # 08:34
-
-                            if check_in_minutes >= late_threshold_minutes:
-                                text_color = colors.HexColor(
-                                    "#FF0000"
-                                )  # Red text for late
-                    except:
-                        pass
-
-            row_colors.append((cell_color, text_color))
-
-            # Create custom paragraph style for this cell with proper color
-            cell_custom_style = ParagraphStyle(
-                f"CellStyle_{idx}_{col}",
-                parent=styles["Normal"],
-                fontSize=12,
-                fontName=font_name_bold if text_color != colors.black else font_name,
-                alignment=TA_CENTER,
-                textColor=text_color,
-                leading=14,
-                wordWrap="CJK",
+    # Invalid uploads count as done straight away
+    job.done = len(errors)
+    job.errors[:] = [errors[key] for key in sorted(errors)]
+    rendered = 0
+
+    def pdfs():
+        nonlocal rendered
+        # Results come back in upload order, so the next one is in progress
+        for position, _, filename in jobs:
+            job.current_file = filename
+            _, pdfs, error = next(results)
+            job.done += 1
+            if error is None:
+                rendered += 1
+                yield from pdfs
+            else:
+                # Reported in upload order, like /batch-convert
+                errors[position] = f"{filename}: {error}"
+                job.errors[:] = [errors[key] for key in sorted(errors)]
+        if summary is not None and rendered:
+            job.current_file = converter.SUMMARY_PDF_FILENAME
+            yield (
+                converter.SUMMARY_PDF_FILENAME,
+                converter.render_summary_pdf(summary, report_date),
             )
 
-            # Wrap value in Paragraph for automatic text wrapping
-            row_data.append(Paragraph(value, cell_custom_style))
-
-        table_data.append(row_data)
-        header_colors.append(row_colors)
-
-    # Ensure table has data
-    if len(table_data) <= 1:
-        raise ValueError("Excel file has no data rows")
-
-    # Create table with better column widths - make DepartmentName dynamic
-    col_widths = []
-    for col in display_columns:
-        if col == "EmployeeName":
-            col_widths.append(1.8 * inch)
-        elif col == "DepartmentName":
-            # Calculate max length for department names to fit content
-            max_dept_length = max(
-                [
-                    len(str(row[col])) if pd.notna(row[col]) else 0
-                    for _, row in df.iterrows()
-                ]
-                + [len(col)]
-            )
-            # Fixed width for department to ensure single line
-            col_widths.append(2.2 * inch)
-        elif col == "AttendanceDate":
-            col_widths.append(1.15 * inch)
-        elif col == "ActualCheckIn":
-            col_widths.append(1.15 * inch)
-        elif col == "ActualCheckOut":
-            col_widths.append(1.15 * inch)
-        else:
-            col_widths.append(0.85 * inch)
-
-    table = Table(table_data, colWidths=col_widths)
-
-    # Apply table styling with Calibri font and size 12
-    table_style = [
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#CCCCCC")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 6),
-        ("TOPPADDING", (0, 0), (-1, 0), 6),
-        ("GRID", (0, 0), (-1, -1), 1, colors.black),
-        ("BOX", (0, 0), (-1, -1), 1.5, colors.black),
-        (
-            "ROWBACKGROUNDS",
-            (0, 1),
-            (-1, -1),
-            [colors.white, colors.HexColor("#FAFAFA")],
-        ),
-        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-        ("TOPPADDING", (0, 1), (-1, -1), 5),
-        ("BOTTOMPADDING", (0, 1), (-1, -1), 5),
-    ]
-
-    # Apply cell-specific colors for check-in column
-    check_in_col = (
-        display_columns.index("ActualCheckIn")
-        if "ActualCheckIn" in display_columns
-        else -1
-    )
-    if check_in_col >= 0:
-        for row_idx, row_colors in enumerate(header_colors, start=1):
-            cell_bg_color, text_color = row_colors[check_in_col]
-
-            # Apply background color (yellow for absent)
-            if cell_bg_color != colors.white:
-                table_style.append(
-                    (
-                        "BACKGROUND",
-                        (check_in_col, row_idx),
-                        (check_in_col, row_idx),
-                        cell_bg_color,
-                    )
-                )
+    result_path = os.path.join(JOBS_FOLDER, f"{job.id}.zip")
+    _write_job_result(result_path, stream_zip(_batch_zip_entries(pdfs(), batch_name)))
+    if not rendered:
+        os.remove(result_path)
+        raise ValueError("No PDFs were generated. " + "; ".join(job.errors))
 
-    table.setStyle(TableStyle(table_style))
-    story.append(table)
+    job.result_path = result_path
+    job.result_filename = _batch_zip_filename()
+    job.mimetype = "application/zip"
 
-    story.append(Spacer(1, 0.15 * inch))
 
-    # Add legend/notes
-    legend_style = ParagraphStyle(
-        "Legend",
-        parent=styles["Normal"],
-        fontSize=12,
-        textColor=colors.black,
-        fontName=font_name_bold,
-        spaceAfter=2,
-        alignment=1,  # TA_CENTER = 1
-    )
+def _run_admitted(job, ticket, fn, *args):
+    # Queued jobs keep their admission slot until they finish
+    try:
+        fn(job, *args)
+    finally:
+        ticket.release()
+
+
+@app.route("/jobs/convert", methods=["POST"])
+def submit_convert_job():
+    """Queue a /convert request; returns a job id to poll"""
+    file = request.files.get("file")
+    report_date = request.form.get("report_date", "")
+    modes, invalid = _report_modes()
+    if invalid:
+        return invalid
+    render_mode, sheet_mode = modes
+
+    if not file or not allowed_file(file.filename):
+        return jsonify(
+            {"error": "Invalid file format. Please upload Excel or CSV files."}
+        ), 400
+
+    ticket, busy = _admit(1, hold=False)
+    if busy:
+        return busy
 
-    story.append(Paragraph("NOTE:", legend_style))
-
-    legend_table_data = [
-        ["", "THE YELLOW COLOR INDICATES ABSENTEEISM"],
-        ["", "THE RED COLOR INDICATES LATE COMERS"],
-    ]
-
-    legend_table = Table(legend_table_data, colWidths=[0.3 * inch, 5.0 * inch])
-    legend_table.setStyle(
-        TableStyle(
-            [
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                ("FONTNAME", (0, 0), (-1, -1), font_name),
-                ("FONTSIZE", (0, 0), (-1, -1), 12),
-                ("BACKGROUND", (0, 0), (0, 0), colors.HexColor("#FFFF00")),
-                ("BACKGROUND", (0, 1), (0, 1), colors.HexColor("#FF0000")),
-                ("TEXTCOLOR", (0, 1), (0, 1), colors.white),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("LEFTPADDING", (0, 0), (-1, -1), 3),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 3),
-                ("TOPPADDING", (0, 0), (-1, -1), 2),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-            ]
+    try:
+        # The request stream is gone once we respond, so keep the upload on disk
+        filename = secure_filename(file.filename)
+        source = _upload_path("job", filename)
+        _save_upload(file, source)
+
+        job = job_queue.submit(
+            "convert",
+            1,
+            _run_admitted,
+            ticket,
+            _run_convert_job,
+            source,
+            filename,
+            report_date,
+            render_mode,
+            sheet_mode,
         )
-    )
+    except Exception:
+        ticket.release()
+        raise
+    return _job_accepted(job)
+
+
+@app.route("/jobs/batch-convert", methods=["POST"])
+def submit_batch_job():
+    """Queue a /batch-convert request; returns a job id to poll"""
+    files = request.files.getlist("files[]")
+    report_date = request.form.get("report_date", "")
+    modes, invalid = _report_modes()
+    if invalid:
+        return invalid
+    render_mode, sheet_mode = modes
+    with_summary = _summary_requested()
+
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    ticket, busy = _admit(len(files), hold=False)
+    if busy:
+        return busy
 
-    story.append(legend_table)
-
-    # Build PDF
-    doc.build(story)
+    try:
+        batch_name = _batch_name()
+        jobs, errors = _save_batch_uploads(files, batch_name)
+
+        job = job_queue.submit(
+            "batch",
+            len(files),
+            _run_admitted,
+            ticket,
+            _run_batch_job,
+            jobs,
+            errors,
+            batch_name,
+            report_date,
+            render_mode,
+            sheet_mode,
+            with_summary,
+        )
+    except Exception:
+        ticket.release()
+        raise
+    return _job_accepted(job)
+
+
+def _job_accepted(job):
+    response = jsonify(
+        {
+            **job.to_dict(),
+            "status_url": url_for("job_status", job_id=job.id),
+            "result_url": url_for("job_result", job_id=job.id),
+        }
+    )
+    response.status_code = 202
+    response.headers["Location"] = url_for("job_status", job_id=job.id)
+    return response
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Progress of a queued conversion"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    """Download the PDF or ZIP of a finished conversion"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job.status == "failed":
+        return jsonify({"error": job.error}), 400
+    if job.status != "done":
+        return jsonify({"error": "Job is not finished yet"}), 409
+    return send_file(
+        os.path.abspath(job.result_path),
+        mimetype=job.mimetype,
+        as_attachment=True,
+        download_name=job.result_filename,
+    )
 
 
 if __name__ == "__main__":
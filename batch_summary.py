@@ -0,0 +1,91 @@
+import numpy as np
+
+from report_sheet import ABSENT, EARLY_CHECK_OUT, LATE
+
+# What is counted per department, in this order
+COUNTS = ("records", "absent", "late", "early_check_outs")
+
+# Department of rows that have none (or sheets without a DepartmentName)
+NO_DEPARTMENT = "(NO DEPARTMENT)"
+
+
+def department_counts(sheets):
+    """{department: [records, absent, late, early]} of [(sheet_name, ReportSheet)]
+
+    Departments are upper-cased with their spacing collapsed, so sheets and
+    exports spelling one differently add up. The counts come straight from
+    the department codes and status flags the sheets already hold: one
+    bincount per flag, however many rows there are.
+    """
+    counts = {}
+    for _, sheet in sheets:
+        column = sheet.column("DepartmentName")
+        if column is None:
+            values, codes = [""], np.zeros(len(sheet), dtype=np.uint8)
+        else:
+            values, codes = column
+        per_value = [np.bincount(codes, minlength=len(values))]
+        per_value.extend(
+            np.bincount(codes, weights=sheet.flags(flag), minlength=len(values))
+            for flag in (ABSENT, LATE, EARLY_CHECK_OUT)
+        )
+        for position, value in enumerate(values):
+            department = " ".join(value.split()).upper() or NO_DEPARTMENT
+            entry = counts.setdefault(department, [0] * len(COUNTS))
+            for i, column_counts in enumerate(per_value):
+                entry[i] += int(column_counts[position])
+    return counts
+
+
+class BatchSummary:
+    """Counts per branch and department of a batch, for SUMMARY.pdf.
+
+    Each converted file's department_counts() (small, computed by the
+    worker that converted it) is merged in with add(), so the summary never
+    goes back to the uploads or the PDFs. Files of the same branch add up.
+    Files that could not be converted are listed with skip().
+    """
+
+    def __init__(self):
+        # branch -> {department: counts}
+        self.branches = {}
+        self.skipped = []
+
+    def add(self, branch, counts):
+        departments = self.branches.setdefault(branch, {})
+        for department, values in counts.items():
+            entry = departments.setdefault(department, [0] * len(COUNTS))
+            for i, value in enumerate(values):
+                entry[i] += value
+
+    def skip(self, filename):
+        self.skipped.append(filename)
+
+    def rows(self):
+        """[(branch, department, counts)] sorted by branch and department
+
+        Each branch ends with a row with department None holding its totals.
+        """
+        rows = []
+        for branch in sorted(self.branches):
+            departments = self.branches[branch]
+            for department in sorted(departments):
+                rows.append((branch, department, departments[department]))
+            rows.append((branch, None, _total(departments.values())))
+        return rows
+
+    def totals(self):
+        """Counts over every branch"""
+        return _total(
+            counts
+            for departments in self.branches.values()
+            for counts in departments.values()
+        )
+
+
+def _total(counts):
+    total = [0] * len(COUNTS)
+    for values in counts:
+        for i, value in enumerate(values):
+            total[i] += value
+    return total
@@ -0,0 +1,99 @@
+"""Compare per-cell ParagraphStyle objects with the shared style registry.
+
+Run from the project root:
+
+    python -m benchmarks.bench_cell_styles --rows 5000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph
+
+from benchmarks.synthetic import make_attendance_frame
+from converter import LATE, LATE_TEXT_COLOR, build_report_sheet, get_cell_style
+
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+
+def build_rows_per_cell_styles(sheet):
+    """The old table builder: a new stylesheet and a new style for every cell"""
+    styles = getSampleStyleSheet()
+    late = sheet.flags(LATE)
+    columns, text = sheet.columns, sheet.column_text()
+    rows = []
+    for row_pos, values in enumerate(zip(*text)):
+        row = []
+        for col, value in zip(columns, values):
+            is_late = col == "ActualCheckIn" and late[row_pos]
+            style = ParagraphStyle(
+                f"CellStyle_{row_pos}_{col}",
+                parent=styles["Normal"],
+                fontSize=12,
+                fontName=FONT_BOLD if is_late else FONT,
+                alignment=TA_CENTER,
+                textColor=LATE_TEXT_COLOR if is_late else "#000000",
+                leading=14,
+                wordWrap="CJK",
+            )
+            row.append(Paragraph(value, style))
+        rows.append(row)
+    return rows
+
+
+def build_rows_shared_styles(sheet):
+    """The current table builder: styles come from the registry"""
+    plain = get_cell_style(FONT)
+    late_style = get_cell_style(FONT_BOLD, LATE_TEXT_COLOR)
+    late = sheet.flags(LATE)
+    columns, text = sheet.columns, sheet.column_text()
+    check_in_pos = columns.index("ActualCheckIn")
+    rows = []
+    for row_pos, values in enumerate(zip(*text)):
+        row = [Paragraph(value, plain) for value in values]
+        if late[row_pos]:
+            row[check_in_pos] = Paragraph(values[check_in_pos], late_style)
+        rows.append(row)
+    return rows
+
+
+def measure(builder, sheet):
+    # Timed and traced separately; tracemalloc slows allocation-heavy code
+    start = time.perf_counter()
+    builder(sheet)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    rows = builder(sheet)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    sheet = build_report_sheet(make_attendance_frame(args.rows))
+    # Warm the registry and reportlab's caches before measuring
+    build_rows_shared_styles(build_report_sheet(make_attendance_frame(10)))
+
+    print(f"{args.rows} rows x {len(sheet.columns)} columns")
+    print(f"{'builder':<20}{'ms / 1k rows':>14}{'peak MiB':>12}")
+    for name, builder in [
+        ("per-cell styles", build_rows_per_cell_styles),
+        ("shared styles", build_rows_shared_styles),
+    ]:
+        elapsed, peak = measure(builder, sheet)
+        per_1k = elapsed * 1000 / (args.rows / 1000)
+        print(f"{name:<20}{per_1k:>14.1f}{peak / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Time the read -> classify -> render pipeline stage by stage.
+
+Run from the project root:
+
+    python -m benchmarks.bench_pipeline --rows 100 1000 --batch 1 10 --output results.json
+
+Three groups of measurements are taken, all on synthetic exports:
+
+- single: one file per row count and format, timed per stage (upload save,
+  read, header detection, parse, cleanup, table build, doc.build)
+- batch: convert_batch over N files plus the streamed ZIP
+- endpoints: /convert and /batch-convert through Flask's test client
+
+Peak memory is traced in a separate pass (tracemalloc slows allocation-heavy
+code), so timings are not inflated by it. Results are written as JSON so two
+runs can be compared.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# Measure real work, not cache hits
+os.environ.setdefault("PDF_CACHE_MAX_MB", "0")
+
+from werkzeug.datastructures import FileStorage
+
+import converter
+from benchmarks.synthetic import EXPORT_FORMATS, write_attendance_export
+from zipstream import stream_zip
+
+REPORT_DATE = "2025-01-02"
+
+
+def single_file_stages(path, fmt, upload_dir, render_mode):
+    """Run one export through every stage; returns {stage: seconds}"""
+    timings = {}
+    clock = time.perf_counter
+
+    start = clock()
+    with open(path, "rb") as f:
+        upload = FileStorage(f, filename=os.path.basename(path))
+        saved = os.path.join(upload_dir, upload.filename)
+        upload.save(saved)
+    timings["save"] = clock() - start
+
+    if fmt == "csv":
+        start = clock()
+        df = converter.read_attendance_csv(saved)
+        timings["read"] = clock() - start
+    else:
+        # The reader finds the header while streaming; the separate header
+        # stage re-runs that scan to show what it costs on its own
+        start = clock()
+        rows, header_row = converter.read_excel_rows(saved)
+        timings["read"] = clock() - start
+
+        start = clock()
+        next((i for i, row in enumerate(rows) if converter.is_header_row(row)), 0)
+        timings["header"] = clock() - start
+
+        start = clock()
+        df = converter.frame_from_rows(rows, header_row)
+        timings["parse"] = clock() - start
+
+    start = clock()
+    sheet = converter.build_report_sheet(df)
+    timings["cleanup"] = clock() - start
+
+    title, subtitle = converter.format_report_titles("BENCH", REPORT_DATE)
+    start = clock()
+    story = converter.build_report_story(sheet, title, subtitle, render_mode)
+    timings["table_build"] = clock() - start
+
+    start = clock()
+    pdf_buffer = io.BytesIO()
+    converter.report_document(pdf_buffer).build(story)
+    timings["doc_build"] = clock() - start
+
+    os.remove(saved)
+    return timings
+
+
+def batch_stages(paths, render_mode):
+    """convert_batch over paths, then the ZIP; returns {stage: seconds}"""
+    clock = time.perf_counter
+    start = clock()
+    pdfs = [
+        pdf
+        for _, file_pdfs, error in converter.convert_batch(
+            [(path, os.path.basename(path)) for path in paths],
+            REPORT_DATE,
+            render_mode,
+        )
+        if error is None
+        for pdf in file_pdfs
+    ]
+    convert_seconds = clock() - start
+
+    start = clock()
+    zip_bytes = sum(len(chunk) for chunk in stream_zip(pdfs))
+    zip_seconds = clock() - start
+    return {"convert": convert_seconds, "zip": zip_seconds}, zip_bytes
+
+
+def peak_memory(fn, *args):
+    """Peak bytes traced while running fn(*args)"""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def endpoint_seconds(client, url, data):
+    """Seconds for one multipart POST through the test client"""
+    start = time.perf_counter()
+    response = client.post(url, data=data, content_type="multipart/form-data")
+    body = response.get_data()
+    # Closing gives back the request's admission slot
+    response.close()
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} answered {response.status_code}: {body[:200]!r}")
+    return elapsed
+
+
+def _export_upload(path):
+    with open(path, "rb") as f:
+        return io.BytesIO(f.read()), os.path.basename(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[100, 1000, 10000, 50000]
+    )
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument(
+        "--batch-rows", type=int, default=100, help="rows per file in batches"
+    )
+    parser.add_argument(
+        "--formats", nargs="+", choices=EXPORT_FORMATS, default=EXPORT_FORMATS
+    )
+    parser.add_argument(
+        "--render-mode",
+        choices=converter.RENDER_MODES,
+        default=converter.RENDER_MODE,
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the peak memory passes"
+    )
+    parser.add_argument(
+        "--no-endpoints", action="store_true", help="skip the Flask test client runs"
+    )
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "batch_workers": converter.BATCH_WORKERS,
+        "render_mode": args.render_mode,
+        "single": [],
+        "batch": [],
+        "endpoints": [],
+    }
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    upload_dir = os.path.join(workdir, "uploads")
+    os.makedirs(upload_dir)
+    try:
+        # Warm fonts, styles and imports so the first case is not penalised
+        warm = os.path.join(workdir, "warm.xlsx")
+        write_attendance_export(warm, 10)
+        single_file_stages(warm, "xlsx", upload_dir, args.render_mode)
+
+        print(f"{'format':<7}{'rows':>7}  stage seconds")
+        for fmt in args.formats:
+            for rows in args.rows:
+                path = os.path.join(workdir, f"single_{rows}.{fmt}")
+                write_attendance_export(path, rows, fmt)
+                stages = single_file_stages(path, fmt, upload_dir, args.render_mode)
+                entry = {
+                    "format": fmt,
+                    "rows": rows,
+                    "file_bytes": os.path.getsize(path),
+                    "stages": stages,
+                    "total": sum(stages.values()),
+                }
+                if not args.no_memory:
+                    entry["peak_bytes"] = peak_memory(
+                        single_file_stages, path, fmt, upload_dir, args.render_mode
+                    )
+                results["single"].append(entry)
+                stage_text = " ".join(f"{k}={v:.3f}" for k, v in stages.items())
+                print(f"{fmt:<7}{rows:>7}  {stage_text}")
+
+        print(f"\n{'format':<7}{'files':>7}  stage seconds")
+        for fmt in args.formats:
+            for count in args.batch:
+                paths = []
+                for i in range(count):
+                    path = os.path.join(workdir, f"batch_{count}_{i}.{fmt}")
+                    write_attendance_export(path, args.batch_rows, fmt, seed=i)
+                    paths.append(path)
+                stages, zip_bytes = batch_stages(paths, args.render_mode)
+                entry = {
+                    "format": fmt,
+                    "files": count,
+                    "rows_per_file": args.batch_rows,
+                    "zip_bytes": zip_bytes,
+                    "stages": stages,
+                    "total": sum(stages.values()),
+                    "files_per_second": count / sum(stages.values()),
+                }
+                if not args.no_memory:
+                    # Parent process only; pool workers are not traced
+                    entry["peak_bytes"] = peak_memory(
+                        batch_stages, paths, args.render_mode
+                    )
+                results["batch"].append(entry)
+                stage_text = " ".join(f"{k}={v:.3f}" for k, v in stages.items())
+                print(f"{fmt:<7}{count:>7}  {stage_text}")
+
+        if not args.no_endpoints:
+            from app import app
+
+            client = app.test_client()
+            print(f"\n{'endpoint':<16}{'format':<7}{'size':>7}  seconds")
+            for fmt in args.formats:
+                for rows in args.rows:
+                    path = os.path.join(workdir, f"single_{rows}.{fmt}")
+                    seconds = endpoint_seconds(
+                        client,
+                        "/convert",
+                        {
+                            "file": _export_upload(path),
+                            "report_date": REPORT_DATE,
+                            "render_mode": args.render_mode,
+                        },
+                    )
+                    results["endpoints"].append(
+                        {
+                            "endpoint": "/convert",
+                            "format": fmt,
+                            "rows": rows,
+                            "seconds": seconds,
+                        }
+                    )
+                    print(f"{'/convert':<16}{fmt:<7}{rows:>7}  {seconds:.3f}")
+                for count in args.batch:
+                    paths = [
+                        os.path.join(workdir, f"batch_{count}_{i}.{fmt}")
+                        for i in range(count)
+                    ]
+                    seconds = endpoint_seconds(
+                        client,
+                        "/batch-convert",
+                        {
+                            "files[]": [_export_upload(path) for path in paths],
+                            "report_date": REPORT_DATE,
+                            "render_mode": args.render_mode,
+                        },
+                    )
+                    results["endpoints"].append(
+                        {
+                            "endpoint": "/batch-convert",
+                            "format": fmt,
+                            "files": count,
+                            "rows_per_file": args.batch_rows,
+                            "seconds": seconds,
+                        }
+                    )
+                    print(f"{'/batch-convert':<16}{fmt:<7}{count:>7}  {seconds:.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["max_rss_bytes"] = (
+            max_rss if sys.platform == "darwin" else max_rss * 1024
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare cleaned DataFrames with compact ReportSheets between parse and render.
+
+Run from the project root:
+
+    python -m benchmarks.bench_report_sheet --rows 1000 20000
+
+For each row count a synthetic workbook is parsed once, then prepared for
+rendering both ways:
+
+- dataframe: the old cleanup and per-column display text, the way sheets
+  were prepared before ReportSheet, with the attendance rules applied to
+  that text
+- report sheet: build_report_sheet and its column_text()
+
+and the time, peak memory, memory kept afterwards and the pickled size
+(what goes to the batch pool) are printed.
+"""
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import converter
+from benchmarks.synthetic import write_attendance_export
+
+
+def clean_attendance_frame(df):
+    """The old cleanup: drop empty rows and unnamed columns from a sheet"""
+    df = df.dropna(how="all")
+    df = df.loc[:, ~df.columns.str.contains("Unnamed", case=False, na=False)]
+    return df.reset_index(drop=True)
+
+
+def prepare_dataframe(df):
+    """The old preparation; returns what was kept and sent to workers"""
+    df = clean_attendance_frame(df)
+    columns = converter.select_display_columns(df.columns)
+    column_text = [
+        df[col].astype(object).map(str).where(df[col].notna(), "").tolist()
+        for col in columns
+    ]
+    return (df, frame_status(columns, column_text)), column_text
+
+
+def frame_status(columns, column_text):
+    """Status flags of the frame's rows under the configured rules"""
+    encoded = [np.unique(np.asarray(text), return_inverse=True) for text in column_text]
+    sheet = converter.ReportSheet(
+        columns,
+        [values.tolist() for values, _ in encoded],
+        [codes for _, codes in encoded],
+        np.zeros(len(column_text[0]), dtype=np.uint8),
+    )
+    return converter.get_attendance_rules().status(sheet)
+
+
+def prepare_report_sheet(df):
+    sheet = converter.build_report_sheet(df)
+    return sheet, sheet.column_text()
+
+
+def kept_bytes(kept):
+    if isinstance(kept, tuple):
+        df, status = kept
+        return int(df.memory_usage(index=True, deep=True).sum()) + status.nbytes
+    return kept.nbytes
+
+
+def measure(prepare, df):
+    # Timed and traced separately; tracemalloc slows allocation-heavy code
+    start = time.perf_counter()
+    prepare(df)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    kept, column_text = prepare(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del column_text
+
+    start = time.perf_counter()
+    data = pickle.dumps(kept, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.loads(data)
+    pickle_seconds = time.perf_counter() - start
+    return elapsed, peak, kept_bytes(kept), len(data), pickle_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 20000])
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>7}  {'preparation':<14}{'ms':>9}{'peak MiB':>10}"
+        f"{'kept MiB':>10}{'pickle KiB':>12}{'pickle ms':>11}"
+    )
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            path = os.path.join(workdir, f"bench_{rows}.xlsx")
+            write_attendance_export(path, rows)
+            df = converter.frame_from_rows(*converter.read_excel_rows(path))
+            for name, prepare in [
+                ("dataframe", prepare_dataframe),
+                ("report sheet", prepare_report_sheet),
+            ]:
+                elapsed, peak, kept, pickled, pickle_seconds = measure(prepare, df)
+                print(
+                    f"{rows:>7}  {name:<14}{elapsed * 1000:>9.1f}"
+                    f"{peak / 2**20:>10.1f}{kept / 2**20:>10.2f}"
+                    f"{pickled / 2**10:>12.1f}{pickle_seconds * 1000:>11.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time applying attendance rules as the number of rules grows.
+
+Run from the project root:
+
+    python -m benchmarks.bench_rules --rows 20000 --rules 0 10 100 1000 10000
+
+For each rule count a rules config is generated with that many rules, each
+setting late and early cut-offs for one (branch, department) pair of a few
+hundred made-up branches, the benchmark's branch among them. The synthetic
+sheet is then built into a ReportSheet once and its status computed under
+every config, and the compile time (AttendanceRules()) and status time are
+printed. Rules are compiled into lookup tables, so the status time should
+stay flat whatever the rule count.
+"""
+
+import argparse
+import time
+
+import converter
+from benchmarks.synthetic import DEPARTMENTS, make_attendance_frame
+from rules import AttendanceRules
+
+BRANCH = "BRANCH 0000"
+
+
+def make_rules(count):
+    """Rules config with count rules spread over branches and departments"""
+    rules = []
+    for number in range(count):
+        branch, department = divmod(number, len(DEPARTMENTS))
+        rules.append(
+            {
+                "branch": f"BRANCH {branch:04d}",
+                "department": DEPARTMENTS[department],
+                "late_from": f"08:{30 + number % 30:02d}",
+                "early_before": "17:30",
+            }
+        )
+    return {"early_before": "16:30", "rules": rules}
+
+
+def best_of(repeat, run, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument(
+        "--rules", type=int, nargs="+", default=[0, 10, 100, 1000, 10000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sheet = converter.build_report_sheet(make_attendance_frame(args.rows), BRANCH)
+    print(f"{'rules':>7}{'compile ms':>12}{'status ms':>11}{'late':>8}{'early':>8}")
+    for count in args.rules:
+        config = make_rules(count)
+        compile_seconds, rules = best_of(args.repeat, AttendanceRules, config)
+        status_seconds, status = best_of(args.repeat, rules.status, sheet, BRANCH)
+        late = int(((status & converter.LATE) != 0).sum())
+        early = int(((status & converter.EARLY_CHECK_OUT) != 0).sum())
+        print(
+            f"{count:>7}{compile_seconds * 1000:>12.1f}"
+            f"{status_seconds * 1000:>11.2f}{late:>8}{early:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
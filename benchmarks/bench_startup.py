@@ -0,0 +1,183 @@
+"""Time app startup and first requests, cold and warmed up.
+
+Run from the project root:
+
+    python -m benchmarks.bench_startup --repeat 5 --output startup.json
+
+Every scenario runs in a fresh interpreter and times, in that process:
+
+- eager: importing app together with converter (how app used to load)
+- lazy: importing app alone, then the page, then a first /convert
+- warm: importing app and running converter.warm_up() before /convert
+- forked: a warmed-up parent forks a child that serves the first /convert,
+  as gunicorn's preloaded workers do (POSIX only)
+
+Medians over the repeats are printed; results are written as JSON so two
+runs can be compared.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCENARIOS = ["eager", "lazy", "warm", "forked"]
+
+REPORT_DATE = "2025-01-02"
+
+
+def _post_convert(client, path):
+    with open(path, "rb") as f:
+        data = {"file": (io.BytesIO(f.read()), os.path.basename(path))}
+    data["report_date"] = REPORT_DATE
+    start = time.perf_counter()
+    response = client.post("/convert", data=data, content_type="multipart/form-data")
+    response.get_data()
+    response.close()
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"/convert answered {response.status_code}")
+    return elapsed
+
+
+def run_scenario(scenario, path):
+    """Timings of one scenario in this (fresh) process; returns {step: seconds}"""
+    timings = {}
+    clock = time.perf_counter
+
+    start = clock()
+    import app
+
+    if scenario == "eager":
+        import converter
+    timings["import"] = clock() - start
+
+    client = app.app.test_client()
+    start = clock()
+    client.get("/").close()
+    timings["first_page"] = clock() - start
+
+    if scenario in ("warm", "forked"):
+        import converter
+
+        start = clock()
+        converter.warm_up()
+        timings["warm_up"] = clock() - start
+
+    if scenario != "forked":
+        timings["first_convert"] = _post_convert(client, path)
+        timings["second_convert"] = _post_convert(client, path)
+        return timings
+
+    # The child reports back through a pipe, as a gunicorn worker would be
+    # forked from the preloaded master
+    read_end, write_end = os.pipe()
+    start = clock()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        child = {"first_convert": _post_convert(client, path)}
+        child["fork_to_response"] = clock() - start
+        with os.fdopen(write_end, "w") as pipe:
+            json.dump(child, pipe)
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        timings.update(json.load(pipe))
+    os.waitpid(pid, 0)
+    return timings
+
+
+def _run_child(scenario, path, workdir):
+    env = dict(os.environ, PDF_CACHE_MAX_MB="0", SHEET_CACHE_MAX_MB="0")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", scenario, path],
+        cwd=workdir,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=50, help="rows in the upload")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(*args.child)))
+        return
+
+    scenarios = [
+        scenario
+        for scenario in args.scenarios
+        if scenario != "forked" or hasattr(os, "fork")
+    ]
+    results = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scenarios": {},
+    }
+
+    from benchmarks.synthetic import write_attendance_export
+
+    # Each run gets its own uploads/ and output/ folders
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        path = os.path.join(workdir, "startup.xlsx")
+        write_attendance_export(path, args.rows)
+        for scenario in scenarios:
+            runs = [_run_child(scenario, path, workdir) for _ in range(args.repeat)]
+            medians = {
+                step: statistics.median(run[step] for run in runs) for step in runs[0]
+            }
+            results["scenarios"][scenario] = {"runs": runs, "median": medians}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    steps = [
+        "import",
+        "first_page",
+        "warm_up",
+        "first_convert",
+        "second_convert",
+        "fork_to_response",
+        "process",
+    ]
+    print(f"{'scenario':<9}" + "".join(f"{step:>17}" for step in steps))
+    for scenario, entry in results["scenarios"].items():
+        cells = [
+            f"{entry['median'][step]:>17.3f}" if step in entry["median"] else " " * 17
+            for step in steps
+        ]
+        print(f"{scenario:<9}" + "".join(cells))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
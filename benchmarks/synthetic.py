@@ -0,0 +1,64 @@
+"""Synthetic attendance data for the benchmarks"""
+
+import random
+from datetime import date, time, timedelta
+
+import pandas as pd
+from openpyxl import Workbook
+
+DEPARTMENTS = ["FINANCE", "HUMAN RESOURCES", "OPERATIONS", "SALES", "IT", "SECURITY"]
+
+
+def make_attendance_frame(rows, seed=0):
+    """Cleaned-sheet shaped DataFrame with ~10% absent and ~25% late rows"""
+    rnd = random.Random(seed)
+    day = date(2025, 1, 2)
+    records = []
+    for i in range(rows):
+        roll = rnd.random()
+        if roll < 0.1:
+            check_in = None
+        elif roll < 0.35:
+            check_in = time(8, 34 + rnd.randint(0, 25))
+        else:
+            check_in = time(7, rnd.randint(30, 59))
+        records.append(
+            {
+                "EmployeeName": f"EMPLOYEE {i:05d}",
+                "DepartmentName": rnd.choice(DEPARTMENTS),
+                "AttendanceDate": pd.Timestamp(day + timedelta(days=i % 5)),
+                "ActualCheckIn": check_in,
+                "ActualCheckOut": None
+                if check_in is None
+                else time(17, rnd.randint(0, 59)),
+                "DayOff": "",
+            }
+        )
+    return pd.DataFrame.from_records(records)
+
+
+# Formats write_attendance_export can produce. Legacy .xls is not listed:
+# pandas 2 has no .xls writer.
+EXPORT_FORMATS = ["xlsx", "csv"]
+
+
+def write_attendance_export(path, rows, fmt="xlsx", seed=0):
+    """Write an attendance export like the ones users upload.
+
+    Workbooks get a few title lines above the header row, so reading them
+    exercises header detection; CSV exports start with the header.
+    """
+    df = make_attendance_frame(rows, seed)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+
+    book = Workbook(write_only=True)
+    sheet = book.create_sheet()
+    sheet.append(["ACME HOLDINGS"])
+    sheet.append(["DAILY ATTENDANCE EXPORT"])
+    sheet.append([])
+    sheet.append(list(df.columns))
+    for record in df.itertuples(index=False):
+        sheet.append([None if pd.isna(v) else v for v in record])
+    book.save(path)
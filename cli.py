@@ -0,0 +1,208 @@
+"""Convert attendance exports to PDF reports without the web server.
+
+    python cli.py exports/ --date 2025-01-02 --output reports/
+    python cli.py "exports/**/*.xlsx" --zip reports.zip --workers 8
+
+Inputs are files, folders (their .xlsx, .xls and .csv files) or glob
+patterns. Files are converted in parallel in the batch worker pool and the
+PDFs written to the output folder, or into one ZIP there. A throughput
+summary is printed at the end.
+
+The same conversion is available to other Python code as find_exports()
+and convert_exports().
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import converter
+from zipstream import stream_zip
+
+# File types the converter reads, as in the web app
+EXPORT_EXTENSIONS = (".xlsx", ".xls", ".csv")
+
+
+def find_exports(inputs, recursive=False):
+    """Export files named by inputs (files, folders or glob patterns).
+
+    Returns sorted, de-duplicated paths. Folders contribute the exports
+    directly inside them, or in any subfolder when recursive is set.
+    """
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(glob.escape(item), "**" if recursive else "", "*")
+            candidates = glob.glob(pattern, recursive=recursive)
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = glob.glob(item, recursive=True)
+        found.update(
+            path
+            for path in candidates
+            if os.path.isfile(path) and path.lower().endswith(EXPORT_EXTENSIONS)
+        )
+    return sorted(found)
+
+
+def convert_exports(
+    paths,
+    output_dir,
+    report_date="",
+    render_mode=converter.RENDER_MODE,
+    sheet_mode=converter.SHEET_MODE,
+    zip_name=None,
+    on_result=None,
+):
+    """Convert export files to PDF reports in output_dir.
+
+    The files go through convert_batch, so they are converted in parallel
+    when BATCH_WORKERS > 1. PDFs are written one by one as they are ready,
+    or streamed into output_dir/zip_name when zip_name is given. Repeated
+    PDF names get a numeric suffix. on_result(filename, pdfs, error) is
+    called for each file in input order.
+
+    Returns a summary dict: files, converted, errors (messages), pdfs,
+    input_bytes, pdf_bytes, seconds and the written paths in outputs.
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {
+        "files": len(paths),
+        "converted": 0,
+        "errors": [],
+        "pdfs": 0,
+        "input_bytes": sum(os.path.getsize(path) for path in paths),
+        "pdf_bytes": 0,
+        "outputs": [],
+    }
+
+    def pdfs():
+        results = converter.convert_batch(
+            [(path, os.path.basename(path)) for path in paths],
+            report_date,
+            render_mode,
+            sheet_mode=sheet_mode,
+        )
+        for filename, file_pdfs, error in results:
+            if on_result is not None:
+                on_result(filename, file_pdfs, error)
+            if error is not None:
+                summary["errors"].append(f"{filename}: {error}")
+                continue
+            summary["converted"] += 1
+            for pdf_filename, pdf_data in file_pdfs:
+                summary["pdfs"] += 1
+                summary["pdf_bytes"] += len(pdf_data)
+                yield pdf_filename, pdf_data
+
+    entries = converter.unique_pdf_filenames(pdfs())
+    if zip_name:
+        zip_path = os.path.join(output_dir, zip_name)
+        with open(zip_path, "wb") as f:
+            f.writelines(stream_zip(entries))
+        summary["outputs"].append(zip_path)
+    else:
+        for pdf_filename, pdf_data in entries:
+            pdf_path = os.path.join(output_dir, pdf_filename)
+            with open(pdf_path, "wb") as f:
+                f.write(pdf_data)
+            summary["outputs"].append(pdf_path)
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def format_summary(summary):
+    """Human-readable throughput lines for a convert_exports() summary"""
+    seconds = max(summary["seconds"], 1e-9)
+    lines = [
+        (
+            f"Converted {summary['converted']}/{summary['files']} file(s) "
+            f"into {summary['pdfs']} PDF(s) in {summary['seconds']:.2f}s"
+        ),
+        (
+            f"Throughput: {summary['files'] / seconds:.2f} files/s, "
+            f"{summary['input_bytes'] / 2**20 / seconds:.2f} MB/s read, "
+            f"{summary['pdf_bytes'] / 2**20 / seconds:.2f} MB/s of PDF written"
+        ),
+    ]
+    if summary["errors"]:
+        lines.append(f"Failed ({len(summary['errors'])}):")
+        lines.extend(f"  {message}" for message in summary["errors"])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[2:]),
+    )
+    parser.add_argument("inputs", nargs="+", help="export files, folders or globs")
+    parser.add_argument(
+        "-o", "--output", default="output", help="folder for the PDFs or the ZIP"
+    )
+    parser.add_argument("--zip", metavar="NAME", help="write one ZIP of all PDFs")
+    parser.add_argument(
+        "--date", default="", help="report date as YYYY-MM-DD (title and filenames)"
+    )
+    parser.add_argument(
+        "--render-mode",
+        choices=converter.RENDER_MODES,
+        default=converter.RENDER_MODE,
+    )
+    parser.add_argument(
+        "--sheet-mode",
+        choices=converter.SHEET_MODES,
+        default=converter.SHEET_MODE,
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="also search subfolders"
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=converter.BATCH_WORKERS,
+        help="worker processes (default: BATCH_WORKERS)",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only print the summary"
+    )
+    args = parser.parse_args(argv)
+
+    paths = find_exports(args.inputs, args.recursive)
+    if not paths:
+        print("No .xlsx, .xls or .csv files found", file=sys.stderr)
+        return 2
+
+    # This process owns the batch pool, so size it before its first use
+    converter.BATCH_WORKERS = args.workers
+
+    def report(filename, pdfs, error):
+        if args.quiet:
+            return
+        if error is None:
+            print(f"ok      {filename} -> {', '.join(name for name, _ in pdfs)}")
+        else:
+            print(f"failed  {filename}: {error}")
+
+    summary = convert_exports(
+        paths,
+        args.output,
+        args.date,
+        args.render_mode,
+        args.sheet_mode,
+        args.zip,
+        report,
+    )
+    print(format_summary(summary))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
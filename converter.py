@@ -0,0 +1,1779 @@
+import codecs
+import csv
+import importlib.util
+import io
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from threading import Lock
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import (
+    Flowable,
+    PageBreak,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+from batch_summary import COUNTS, department_counts
+from fonts import REPORT_FONT, REPORT_FONT_BOLD
+from metrics import record_conversion, timed
+from pdf_cache import upload_digest
+from report_sheet import ABSENT, EARLY_CHECK_OUT, LATE, ReportSheet
+from rules import AttendanceRules
+
+# Number of worker processes used by batch conversion (0 or 1 = run inline)
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+
+# Default table renderer: "standard" (platypus Table), "fast" (canvas grid)
+# or "chunked" (platypus Tables built a page at a time, bounded memory)
+RENDER_MODES = ("standard", "fast", "chunked")
+RENDER_MODE = os.environ.get("RENDER_MODE", "standard")
+
+# CSV parser: the multithreaded "pyarrow" reader when it is installed,
+# otherwise pandas' own "c" parser
+CSV_ENGINE = os.environ.get("CSV_ENGINE") or (
+    "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+)
+
+# CSV columns read as text, so dates and times display exactly as exported
+CSV_TEXT_COLUMNS = ["AttendanceDate", "ActualCheckIn", "ActualCheckOut"]
+
+# Bytes read up front to detect a CSV file's encoding, delimiter and header
+CSV_SAMPLE_BYTES = 64 * 1024
+CSV_DELIMITERS = ",;\t|"
+
+# Only materialise the display columns of Excel sheets (once the header row
+# is found) instead of every column of every row
+EXCEL_COLUMN_PROJECTION = os.environ.get("EXCEL_COLUMN_PROJECTION", "1") == "1"
+
+# Sheets a workbook report is built from: "first" sheet only, all sheets
+# "combined" into one PDF, or a "separate" PDF per sheet
+SHEET_MODES = ("first", "combined", "separate")
+SHEET_MODE = os.environ.get("SHEET_MODE", "first")
+
+# Rows laid out at a time by the "chunked" render mode
+RENDER_CHUNK_ROWS = int(os.environ.get("RENDER_CHUNK_ROWS", "64"))
+
+# JSON file of late, early check-out and day-off rules per branch,
+# department and shift; empty keeps the built-in 08:34 late rule only
+ATTENDANCE_RULES = os.environ.get("ATTENDANCE_RULES", "")
+
+# Add SUMMARY.pdf (absent/late counts per branch and department) to batch
+# ZIPs unless a request says otherwise
+BATCH_SUMMARY = os.environ.get("BATCH_SUMMARY", "0") == "1"
+
+# Name of the batch summary in the ZIP
+SUMMARY_PDF_FILENAME = "SUMMARY.pdf"
+
+_batch_pool = None
+_batch_pool_lock = Lock()
+_attendance_rules = None
+
+
+def _read_frames(source, filename, sheet_mode, stats):
+    """[(sheet_name, df)] of the sheets a report is built from, uncleaned.
+
+    Only the first sheet is read when sheet_mode is "first"; otherwise
+    every sheet holding rows is, or just the first when none do. A CSV
+    file is a single sheet named None.
+    """
+    if filename is None:
+        filename = source
+    with timed(stats, "parse"):
+        if filename.endswith(".csv"):
+            return [(None, read_attendance_csv(source))]
+        if sheet_mode == "first":
+            # Parse the sheet once; the header row is found while rows stream past
+            rows, header_row = read_excel_rows(source)
+            return [(None, frame_from_rows(rows, header_row))]
+
+        raw_sheets = read_excel_sheets(source)
+        # Blank sheets (e.g. an unused "Sheet2") are skipped
+        raw_sheets = [sheet for sheet in raw_sheets if sheet[1]] or raw_sheets[:1]
+        return [
+            (sheet_name, frame_from_rows(rows, header_row))
+            for sheet_name, rows, header_row in raw_sheets
+        ]
+
+
+def read_attendance_csv(source):
+    """Read a CSV export, parsing only the columns the report displays.
+
+    Encoding, delimiter and column names come from a small sample of the
+    file, so it is only parsed once. Dates and times are kept as text, and
+    the pyarrow reader is used when CSV_ENGINE is "pyarrow". As with Excel
+    column projection, a row with data only in other columns is empty once
+    read and is dropped by the cleanup.
+    """
+    encoding, delimiter, columns = sniff_csv(_read_sample(source))
+    if not any(col in columns for col in PREFERRED_COLUMNS):
+        # Unknown layout: the report falls back to the first columns
+        return pd.read_csv(source, sep=delimiter, encoding=encoding)
+    wanted = [col for col in report_columns() if col in columns]
+
+    text_columns = [col for col in CSV_TEXT_COLUMNS if col in wanted]
+    if CSV_ENGINE == "pyarrow":
+        try:
+            return _read_csv_pyarrow(source, encoding, delimiter, wanted, text_columns)
+        except Exception:
+            # e.g. ragged rows, which pandas' own parser tolerates
+            if not isinstance(source, (str, os.PathLike)):
+                source.seek(0)
+    return pd.read_csv(
+        source,
+        sep=delimiter,
+        encoding=encoding,
+        usecols=wanted,
+        dtype={col: str for col in text_columns},
+    )
+
+
+def _read_csv_pyarrow(source, encoding, delimiter, columns, text_columns):
+    # Imported here: pyarrow is optional and slow to import
+    import pyarrow
+    from pyarrow import csv as pyarrow_csv
+
+    table = pyarrow_csv.read_csv(
+        source,
+        read_options=pyarrow_csv.ReadOptions(encoding=encoding),
+        parse_options=pyarrow_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pyarrow_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={col: pyarrow.string() for col in text_columns},
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+
+def _read_sample(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(CSV_SAMPLE_BYTES)
+    sample = source.read(CSV_SAMPLE_BYTES)
+    source.seek(0)
+    return sample
+
+
+def sniff_csv(sample):
+    """Guess (encoding, delimiter, column names) from the start of a CSV file"""
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    elif sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = "utf-16"
+    else:
+        try:
+            sample.decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError as e:
+            # A character cut in half at the end of the sample is still UTF-8
+            encoding = "utf-8" if e.start >= len(sample) - 3 else "cp1252"
+
+    lines = sample.decode(encoding, errors="replace").splitlines()
+    # The last line of the sample may be cut short
+    lines = [line for line in lines[:-1] or lines if line.strip()][:20]
+    if not lines:
+        return encoding, ",", []
+
+    try:
+        delimiter = csv.Sniffer().sniff("\n".join(lines), CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    columns = next(csv.reader(lines[:1], delimiter=delimiter))
+    return encoding, delimiter, columns
+
+
+def is_header_row(values):
+    """True for the sheet row holding column names (usually has EmployeeName)"""
+    row_str = " ".join(str(v) for v in values if pd.notna(v))
+    return "EmployeeName" in row_str or "employee" in row_str.lower()
+
+
+def read_excel_rows(source):
+    """Read the first sheet of a workbook into row lists in a single pass.
+
+    Returns (rows, header_row). Rows match what pandas' own Excel readers
+    hand to their parser, so building a frame from them gives the same
+    result as pd.read_excel(source, header=header_row).
+    """
+    if not _is_xlsx(source):
+        # Legacy .xls goes through pandas' reader, but still only once
+        df_raw = pd.read_excel(source, header=None)
+        return _frame_rows(df_raw)
+
+    book = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        return _worksheet_rows(book.worksheets[0])
+    finally:
+        book.close()
+
+
+def read_excel_sheets(source):
+    """Read every sheet of a workbook, opening and parsing the file once.
+
+    Returns [(sheet_name, rows, header_row)] in workbook order, each sheet's
+    rows and header row found the same way as read_excel_rows does.
+    """
+    if not _is_xlsx(source):
+        frames = pd.read_excel(source, sheet_name=None, header=None)
+        return [(name, *_frame_rows(df_raw)) for name, df_raw in frames.items()]
+
+    book = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        return [(sheet.title, *_worksheet_rows(sheet)) for sheet in book.worksheets]
+    finally:
+        book.close()
+
+
+def _is_xlsx(source):
+    # xlsx files are zip archives; anything else is left to pandas
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(4) == b"PK\x03\x04"
+    is_xlsx = source.read(4) == b"PK\x03\x04"
+    source.seek(0)
+    return is_xlsx
+
+
+def _frame_rows(df_raw):
+    header_row = next(
+        (
+            i
+            for i, row in enumerate(df_raw.itertuples(index=False, name=None))
+            if is_header_row(row)
+        ),
+        0,
+    )
+    if EXCEL_COLUMN_PROJECTION and len(df_raw):
+        columns = display_column_positions(df_raw.iloc[header_row].tolist())
+        if columns:
+            df_raw = df_raw.iloc[:, columns]
+    return df_raw.values.tolist(), header_row
+
+
+def _worksheet_rows(sheet):
+    sheet.reset_dimensions()
+
+    rows = []
+    header_row = None
+    last_row_with_data = -1
+    # Positions of the display columns, once the header row is known
+    columns = None
+    for row_number, row in enumerate(sheet.rows):
+        values = [_convert_cell(cell) for cell in row]
+        # Trim trailing empty cells
+        while values and values[-1] == "":
+            values.pop()
+        if values:
+            last_row_with_data = row_number
+            if header_row is None and is_header_row(values):
+                header_row = row_number
+                if EXCEL_COLUMN_PROJECTION:
+                    columns = display_column_positions(values)
+        if columns:
+            # Rows above the header are skipped by the parser anyway
+            rows = [[] for _ in rows]
+            rows.append([values[i] for i in columns])
+            break
+        rows.append(values)
+
+    if columns:
+        # Only materialise the display columns of the remaining rows
+        first = columns[0]
+        offsets = [i - first for i in columns]
+        remaining = sheet.iter_rows(
+            min_row=header_row + 2, min_col=first + 1, max_col=columns[-1] + 1
+        )
+        for row_number, row in enumerate(remaining, start=header_row + 1):
+            values = [_convert_cell(row[i]) for i in offsets]
+            while values and values[-1] == "":
+                values.pop()
+            if values:
+                last_row_with_data = row_number
+            rows.append(values)
+
+    # Trim trailing empty rows and pad the rest to the widest row
+    rows = rows[: last_row_with_data + 1]
+    if rows:
+        width = max(len(values) for values in rows)
+        rows = [values + [""] * (width - len(values)) for values in rows]
+
+    return rows, header_row or 0
+
+
+def _convert_cell(cell):
+    # Same conversion pandas applies to openpyxl cells
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return float("nan")
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def display_column_positions(header):
+    """Positions of the report's columns in a header row, in order.
+
+    Those are the preferred display columns and any the attendance rules
+    read. None when the header has no display column, in which case the
+    report shows the sheet's first columns and nothing can be left out.
+    """
+    if not any(col in header for col in PREFERRED_COLUMNS):
+        return None
+    return sorted(header.index(col) for col in report_columns() if col in header)
+
+
+def report_columns():
+    """Columns a report reads: the display columns, then the rules' own"""
+    rule_columns = get_attendance_rules().columns
+    return PREFERRED_COLUMNS + [c for c in rule_columns if c not in PREFERRED_COLUMNS]
+
+
+def get_attendance_rules():
+    """The rules from ATTENDANCE_RULES (or the default), loaded once per process"""
+    global _attendance_rules
+    if _attendance_rules is None:
+        # Loading twice in a race is harmless: both give the same rules
+        if ATTENDANCE_RULES:
+            _attendance_rules = AttendanceRules.load(ATTENDANCE_RULES)
+        else:
+            _attendance_rules = AttendanceRules()
+    return _attendance_rules
+
+
+def frame_from_rows(rows, header_row):
+    """Build a DataFrame from raw sheet rows using the given header row"""
+    if not rows:
+        return pd.DataFrame()
+    parser = TextParser(rows, header=header_row, skip_blank_lines=False)
+    return parser.read()
+
+
+def format_report_titles(branch_name, report_date):
+    """Build the report title and subtitle for a branch and report date"""
+    formatted_title = f"{branch_name} DAILY STAFF ATTENDANCE"
+    formatted_subtitle = "LATE COMMERS AND ABSENTEEISM AS AT"
+    if report_date and report_date.strip():
+        try:
+            date_obj = datetime.strptime(report_date, "%Y-%m-%d")
+            formatted_subtitle = (
+                f"LATE COMMERS AND ABSENTEEISM AS AT {date_obj.strftime('%d %B %Y')}"
+            )
+        except:
+            formatted_subtitle = f"LATE COMMERS AND ABSENTEEISM AS AT {report_date}"
+    return formatted_title, formatted_subtitle
+
+
+def report_pdf_filename(branch_name, report_date):
+    """PDF filename with branch name and date (only if date provided)"""
+    if report_date and report_date.strip():
+        try:
+            date_obj = datetime.strptime(report_date, "%Y-%m-%d")
+            date_str = date_obj.strftime("%d-%m-%Y")
+            return f"{branch_name}_{date_str}.pdf"
+        except:
+            pass
+    return f"{branch_name}.pdf"
+
+
+def unique_pdf_filenames(pdfs):
+    """Yield (pdf_filename, pdf_data) with repeated filenames made unique.
+
+    Exports from different folders can share a name; later PDFs with a name
+    already used get a _2, _3, ... suffix instead of replacing the first.
+    """
+    used = set()
+    for pdf_filename, pdf_data in pdfs:
+        stem, extension = os.path.splitext(pdf_filename)
+        copy = 1
+        while pdf_filename in used:
+            copy += 1
+            pdf_filename = f"{stem}_{copy}{extension}"
+        used.add(pdf_filename)
+        yield pdf_filename, pdf_data
+
+
+def read_report_sheets(
+    source, filename, sheet_mode="first", stats=None, branch_name=None
+):
+    """The sheets a report is built from, as [(sheet_name, ReportSheet)].
+
+    All sheets holding data rows (or just the first when none do), or only
+    the first sheet when sheet_mode is "first". Each is built straight from
+    the parsed frame by build_report_sheet(), with the attendance rules of
+    branch_name (by default the upper-cased filename without extension).
+    """
+    if branch_name is None:
+        branch_name = os.path.splitext(os.path.basename(filename))[0].upper()
+    sheets = _read_frames(source, filename, sheet_mode, stats)
+    with timed(stats, "cleanup"):
+        sheets = [
+            (sheet_name, build_report_sheet(df, branch_name))
+            for sheet_name, df in sheets
+        ]
+
+    if sheet_mode != "first":
+        sheets = [(name, sheet) for name, sheet in sheets if len(sheet)] or sheets[:1]
+    if stats is not None:
+        stats["rows"] = sum(len(sheet) for _, sheet in sheets)
+    return sheets
+
+
+def build_report_sheet(df, branch_name=""):
+    """Compact ReportSheet of a freshly read sheet, built in one pass.
+
+    Has the rows, columns and text the report shows for df once its empty
+    rows and "Unnamed" columns are dropped, without making cleaned copies
+    of the frame: only the display columns (and those the attendance rules
+    read) are converted to text, and the rules are applied per distinct
+    value rather than per row.
+    """
+    # Columns kept by the cleanup, by position (names are not unique in
+    # every reader)
+    named = [
+        (position, col)
+        for position, col in enumerate(df.columns)
+        if not (isinstance(col, str) and "unnamed" in col.lower())
+    ]
+
+    # Rows with a value in any of those columns
+    keep = np.zeros(len(df), dtype=bool)
+    for position, _ in named:
+        keep |= df.iloc[:, position].notna().to_numpy()
+    if keep.all():
+        keep = None
+
+    display_columns = select_display_columns([col for _, col in named])
+    positions = {}
+    for position, col in named:
+        positions.setdefault(col, position)
+
+    values = []
+    codes = []
+    for col in display_columns:
+        column_values, column_codes = _encode_column(df.iloc[:, positions[col]], keep)
+        values.append(column_values)
+        codes.append(column_codes)
+    extra = {
+        col: _encode_column(df.iloc[:, positions[col]], keep)
+        for col in get_attendance_rules().columns
+        if col in positions and col not in display_columns
+    }
+
+    row_count = len(df) if keep is None else int(keep.sum())
+    sheet = ReportSheet(
+        display_columns, values, codes, np.zeros(row_count, dtype=np.uint8), extra
+    )
+    return classify_sheet(sheet, branch_name)
+
+
+def _encode_column(column, keep):
+    # Display text ("" for missing values) of the kept rows, as distinct
+    # texts and each row's position in them
+    if keep is not None:
+        column = column[keep]
+    text = column.astype(object).map(str).where(column.notna(), "")
+    codes, uniques = pd.factorize(text)
+    return uniques.tolist(), codes.astype(np.min_scalar_type(max(len(uniques) - 1, 0)))
+
+
+def classify_sheet(sheet, branch_name=""):
+    """The ReportSheet with its rows' status under the branch's attendance rules"""
+    return sheet.with_status(get_attendance_rules().status(sheet, branch_name))
+
+
+def render_attendance_pdfs(
+    sheets,
+    branch_name,
+    report_date,
+    render_mode="standard",
+    sheet_mode="first",
+    stats=None,
+    parallel=False,
+):
+    """Render [(sheet_name, ReportSheet)] to a list of (pdf_filename, pdf_data).
+
+    A single sheet always gives one PDF. With several, "combined" puts them
+    in one PDF, each sheet a section starting on a new page, and "separate"
+    gives one PDF per sheet, rendered in the batch pool when parallel is set.
+    """
+    if len(sheets) == 1:
+        formatted_title, formatted_subtitle = format_report_titles(
+            branch_name, report_date
+        )
+        pdf_buffer = io.BytesIO()
+        generate_attendance_pdf(
+            pdf_buffer,
+            sheets[0][1],
+            formatted_title,
+            formatted_subtitle,
+            report_date,
+            render_mode,
+            stats,
+        )
+        return [(report_pdf_filename(branch_name, report_date), pdf_buffer.getvalue())]
+
+    if sheet_mode != "separate":
+        story = []
+        with timed(stats, "table_build"):
+            for sheet_name, sheet in sheets:
+                if story:
+                    story.append(PageBreak())
+                formatted_title, formatted_subtitle = format_report_titles(
+                    _sheet_title(branch_name, sheet_name), report_date
+                )
+                story.extend(
+                    build_report_story(
+                        sheet, formatted_title, formatted_subtitle, render_mode
+                    )
+                )
+        pdf_buffer = io.BytesIO()
+        with timed(stats, "pdf_build"):
+            report_document(pdf_buffer).build(story)
+        return [(report_pdf_filename(branch_name, report_date), pdf_buffer.getvalue())]
+
+    jobs = [
+        (
+            sheet,
+            *format_report_titles(_sheet_title(branch_name, sheet_name), report_date),
+            report_date,
+            render_mode,
+        )
+        for sheet_name, sheet in sheets
+    ]
+    if parallel and BATCH_WORKERS > 1:
+        # The sheets were parsed once here; workers only get their compact
+        # ReportSheets and render them
+        pool = _get_batch_pool()
+        try:
+            rendered = list(pool.map(_render_sheet, *zip(*jobs)))
+        except BrokenProcessPool:
+            _reset_batch_pool(pool)
+            raise
+    else:
+        rendered = [_render_sheet(*job) for job in jobs]
+
+    pdfs = []
+    for (sheet_name, _), (pdf_data, sheet_stats) in zip(sheets, rendered):
+        if stats is not None:
+            for stage in ("table_build", "pdf_build"):
+                stats[stage] = stats.get(stage, 0.0) + sheet_stats[stage]
+        sheet_label = _SHEET_NAME_UNSAFE.sub("_", sheet_name.upper()).strip("_")
+        pdf_filename = report_pdf_filename(f"{branch_name}_{sheet_label}", report_date)
+        pdfs.append((pdf_filename, pdf_data))
+    return pdfs
+
+
+def _sheet_title(branch_name, sheet_name):
+    # Sheet names are free text; keep them from being read as markup
+    return f"{branch_name} {escape(sheet_name.upper())}"
+
+
+# Characters replaced in sheet names used in PDF filenames
+_SHEET_NAME_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def _render_sheet(sheet, title, subtitle, report_date, render_mode):
+    """Render one sheet; returns (pdf_data, stats). Runs in a worker process"""
+    stats = {}
+    pdf_buffer = io.BytesIO()
+    generate_attendance_pdf(
+        pdf_buffer, sheet, title, subtitle, report_date, render_mode, stats
+    )
+    return pdf_buffer.getvalue(), stats
+
+
+def convert_batch_file(
+    filepath, filename, report_date, render_mode="standard", sheet_mode="first"
+):
+    """Read, clean and render one batch upload.
+
+    Returns (pdfs, stats, counts): the (pdf_filename, pdf_data) list, the
+    stage timings and the department_counts() for a batch summary. Runs
+    inside a worker process, so it only takes and returns plain values;
+    sheets of a workbook are rendered one after another.
+    """
+    start = time.perf_counter()
+    stats = {}
+    sheets = read_report_sheets(filepath, filename, sheet_mode, stats)
+
+    # Title includes branch name + "DAILY STAFF ATTENDANCE", subtitle is date
+    branch_name = os.path.splitext(filename)[0].upper()
+    pdfs = render_attendance_pdfs(
+        sheets, branch_name, report_date, render_mode, sheet_mode, stats
+    )
+    counts = department_counts(sheets)
+    stats["seconds"] = time.perf_counter() - start
+    return pdfs, stats, counts
+
+
+def warm_up():
+    """Do once what a process's first conversion would otherwise pay for.
+
+    Reads a tiny in-memory workbook and CSV, then renders them in every
+    render mode. That loads the lazily imported reader and writer modules,
+    the report fonts and styles, the report template and reportlab's
+    caches. Nothing is written to disk or recorded in the metrics, and the
+    batch pool is not started (forked processes cannot share it).
+    """
+    from openpyxl import Workbook
+
+    book = Workbook()
+    sheet = book.active
+    sheet.append(["WARM UP"])
+    sheet.append(PREFERRED_COLUMNS)
+    sheet.append(["Warm Up", "IT", "2025-01-02", "09:15", "17:00", "No"])
+    sheet.append(["Warm Up", "IT", "2025-01-02", None, None, "No"])
+    workbook = io.BytesIO()
+    book.save(workbook)
+    workbook.seek(0)
+    sheets = read_report_sheets(workbook, "warm_up.xlsx", "combined")
+
+    csv_data = io.BytesIO(b"EmployeeName,ActualCheckIn\nWarm Up,09:15\n")
+    read_report_sheets(csv_data, "warm_up.csv")
+
+    for render_mode in RENDER_MODES:
+        render_attendance_pdfs(sheets, "WARM UP", "2025-01-02", render_mode)
+
+
+def _get_batch_pool():
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            # Workers build the report template before their first job
+            _batch_pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS, initializer=get_report_template
+            )
+        return _batch_pool
+
+
+def _reset_batch_pool(pool):
+    """Drop a broken pool, unless it has already been replaced"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is not pool:
+            return
+        _batch_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def report_cache_key(
+    cache,
+    source,
+    filename,
+    report_date,
+    render_mode,
+    sheet_mode="first",
+    upload_id=None,
+):
+    """PdfCache key for rendering an upload with the given report options
+
+    upload_id is the upload's upload_digest(), when already known; source
+    is not read then.
+    """
+    branch_name = os.path.splitext(filename)[0].upper()
+    title, subtitle = format_report_titles(branch_name, report_date)
+    if upload_id is None:
+        upload_id = upload_digest(source)
+    render_inputs = {}
+    rules = get_attendance_rules()
+    if rules.configured:
+        # Editing the rules file (and restarting) renders reports afresh
+        render_inputs["rules"] = rules.fingerprint
+    return cache.digest_key(
+        upload_id,
+        title=title,
+        subtitle=subtitle,
+        report_date=report_date,
+        render_mode=render_mode,
+        sheet_mode=sheet_mode,
+        **render_inputs,
+    )
+
+
+def counts_cache_key(cache, filename, sheet_mode, upload_id):
+    """PdfCache key for an upload's department_counts() (batch summaries)"""
+    branch_name = os.path.splitext(filename)[0].upper()
+    render_inputs = {}
+    rules = get_attendance_rules()
+    if rules.configured:
+        render_inputs["rules"] = rules.fingerprint
+    return cache.digest_key(
+        upload_id,
+        summary_counts=branch_name,
+        sheet_mode=sheet_mode,
+        **render_inputs,
+    )
+
+
+def convert_batch(
+    jobs,
+    report_date,
+    render_mode="standard",
+    cache=None,
+    sheet_mode="first",
+    summary=None,
+):
+    """Convert (filepath, filename) jobs, in parallel when BATCH_WORKERS > 1.
+
+    Yields one (filename, pdfs, error) tuple per job in upload order, as
+    soon as that job is done: pdfs is a list of (pdf_filename, pdf_data),
+    more than one when sheet_mode is "separate", and error is None on
+    success. Only a small window of jobs runs ahead of the consumer, so
+    finished PDFs do not pile up in memory. With a PdfCache, files rendered
+    before with the same options are served from it instead of being
+    converted. Every file is recorded in the conversion metrics.
+
+    With a BatchSummary, the counts each worker returns are merged into it
+    as files finish (and kept in the PdfCache next to the PDF, so cached
+    files count too); it is complete once every result has been taken.
+    """
+
+    def from_cache(filepath, filename):
+        if cache is None or not cache.enabled:
+            return None, None
+        start = time.perf_counter()
+        upload_id = upload_digest(filepath)
+        key = report_cache_key(
+            cache,
+            filepath,
+            filename,
+            report_date,
+            render_mode,
+            sheet_mode,
+            upload_id,
+        )
+        counts = None
+        if summary is not None:
+            counts_key = counts_cache_key(cache, filename, sheet_mode, upload_id)
+            counts_data = cache.get(counts_key)
+            if counts_data is None:
+                # Convert again: the summary needs the file's counts
+                return (key, counts_key), None
+            counts = json.loads(counts_data)
+        else:
+            counts_key = None
+        pdf_data = cache.get(key)
+        if pdf_data is None:
+            return (key, counts_key), None
+        record_conversion(
+            "batch",
+            filename,
+            "cached",
+            time.perf_counter() - start,
+            pdf_bytes=len(pdf_data),
+        )
+        branch_name = os.path.splitext(filename)[0].upper()
+        if counts is not None:
+            summary.add(branch_name, counts)
+        return (key, counts_key), (
+            filename,
+            [(report_pdf_filename(branch_name, report_date), pdf_data)],
+            None,
+        )
+
+    def finish(keys, filename, converted):
+        pdfs, stats, counts = converted
+        key, counts_key = keys or (None, None)
+        # Only single-PDF results fit in the cache
+        if key is not None and len(pdfs) == 1:
+            cache.put(key, pdfs[0][1])
+        if summary is not None:
+            summary.add(os.path.splitext(filename)[0].upper(), counts)
+            if counts_key is not None:
+                cache.put(counts_key, json.dumps(counts).encode())
+        record_conversion(
+            "batch",
+            filename,
+            "ok",
+            stats["seconds"],
+            stats,
+            sum(len(pdf_data) for _, pdf_data in pdfs),
+        )
+        return (filename, pdfs, None)
+
+    def failed(filename, error):
+        record_conversion("batch", filename, "error", 0.0)
+        if summary is not None:
+            summary.skip(filename)
+        return (filename, None, error)
+
+    if BATCH_WORKERS <= 1 or len(jobs) <= 1:
+        for filepath, filename in jobs:
+            keys, result = from_cache(filepath, filename)
+            if result is None:
+                try:
+                    converted = convert_batch_file(
+                        filepath, filename, report_date, render_mode, sheet_mode
+                    )
+                except Exception as e:
+                    result = failed(filename, str(e))
+                else:
+                    result = finish(keys, filename, converted)
+            yield result
+        return
+
+    remaining = iter(jobs)
+    # (filepath, filename, cache keys, pool, future, retried) for jobs sent
+    # to a pool, or (filepath, filename, None, None, result, False) for
+    # cache hits
+    pending = deque()
+
+    def submit(filepath, filename, keys, retried=False):
+        args = (filepath, filename, report_date, render_mode, sheet_mode)
+        pool = _get_batch_pool()
+        try:
+            future = pool.submit(convert_batch_file, *args)
+        except BrokenProcessPool:
+            # It broke since its last job was taken; start a fresh one
+            _reset_batch_pool(pool)
+            pool = _get_batch_pool()
+            future = pool.submit(convert_batch_file, *args)
+        return (filepath, filename, keys, pool, future, retried)
+
+    def submit_next():
+        job = next(remaining, None)
+        if job is None:
+            return
+        filepath, filename = job
+        keys, result = from_cache(filepath, filename)
+        if result is not None:
+            pending.append((filepath, filename, None, None, result, False))
+            return
+        pending.append(submit(filepath, filename, keys))
+
+    try:
+        for _ in range(BATCH_WORKERS * 2):
+            submit_next()
+
+        while pending:
+            filepath, filename, keys, pool, future, retried = pending.popleft()
+            if pool is None:
+                result = future
+            else:
+                try:
+                    converted = future.result()
+                except BrokenProcessPool as e:
+                    # A worker died (e.g. out of memory), failing every job
+                    # in flight on its pool. Each is retried once in a fresh
+                    # pool; only a job that breaks that one too has failed
+                    _reset_batch_pool(pool)
+                    if not retried:
+                        pending.appendleft(submit(filepath, filename, keys, True))
+                        continue
+                    result = failed(filename, str(e) or "Worker process failed")
+                except Exception as e:
+                    result = failed(filename, str(e))
+                else:
+                    result = finish(keys, filename, converted)
+            submit_next()
+            yield result
+    finally:
+        # The consumer stopped early (e.g. client disconnected)
+        for _, _, _, pool, future, _ in pending:
+            if pool is not None:
+                future.cancel()
+
+
+# SUMMARY.pdf columns: branch, department, then one per batch_summary.COUNTS
+SUMMARY_COLUMNS = ["Branch", "Department", "Records", "Absent", "Late", "Early Out"]
+SUMMARY_COL_WIDTHS = [
+    2.3 * inch,
+    2.3 * inch,
+    0.9 * inch,
+    0.8 * inch,
+    0.8 * inch,
+    0.8 * inch,
+]
+
+
+def render_summary_pdf(summary, report_date):
+    """PDF of a BatchSummary: counts per branch and department, with totals"""
+    template = get_report_template()
+    title, subtitle = format_report_titles("ALL BRANCHES", report_date)
+    story = template.header(f"{title} SUMMARY", subtitle)
+
+    totals = summary.totals()
+    # Early check-outs only get a column when the rules flagged some
+    shown = 2 + len(COUNTS) - (0 if totals[-1] else 1)
+    cell_style = get_cell_style(REPORT_FONT)
+    cell_style_bold = get_cell_style(REPORT_FONT_BOLD)
+
+    def row(branch, department, counts, style):
+        cells = [branch, department, *map(str, counts)][:shown]
+        return [Paragraph(escape(text), style) for text in cells]
+
+    table_data = [_paragraph_header(SUMMARY_COLUMNS[:shown], REPORT_FONT_BOLD)]
+    for branch, department, counts in summary.rows():
+        if department is None:
+            table_data.append(row(branch, "TOTAL", counts, cell_style_bold))
+        else:
+            table_data.append(row(branch, department, counts, cell_style))
+    table_data.append(row("ALL BRANCHES", "TOTAL", totals, cell_style_bold))
+
+    table = Table(table_data, colWidths=SUMMARY_COL_WIDTHS[:shown], repeatRows=1)
+    table.setStyle(template.table_style([]))
+    story.append(table)
+    if summary.skipped:
+        story.append(Spacer(1, 0.15 * inch))
+        story.append(
+            Paragraph(
+                "NOT INCLUDED (COULD NOT BE CONVERTED): "
+                + escape(", ".join(summary.skipped)),
+                template.legend_style,
+            )
+        )
+
+    pdf_buffer = io.BytesIO()
+    report_document(pdf_buffer).build(story)
+    return pdf_buffer.getvalue()
+
+
+# Text color for late check-ins
+LATE_TEXT_COLOR = colors.HexColor("#FF0000")
+
+# Text color for early check-outs (only flagged when the attendance rules
+# set an early_before time)
+EARLY_TEXT_COLOR = colors.HexColor("#0070C0")
+
+# Cell backgrounds: table header, every other row, absent check-ins
+HEADER_BACKGROUND = colors.HexColor("#CCCCCC")
+STRIPE_BACKGROUND = colors.HexColor("#FAFAFA")
+ABSENT_BACKGROUND = colors.HexColor("#FFFF00")
+
+# Stylesheet, cell styles and report template are shared by every render in
+# this process
+_sample_styles = None
+_cell_styles = {}
+_report_template = None
+_style_lock = Lock()
+
+
+def get_sample_styles():
+    """reportlab's sample stylesheet, built once per process"""
+    global _sample_styles
+    if _sample_styles is None:
+        with _style_lock:
+            if _sample_styles is None:
+                _sample_styles = getSampleStyleSheet()
+    return _sample_styles
+
+
+def get_cell_style(font_name, text_color=colors.black):
+    """Shared table cell style for a font and text color.
+
+    Bold cells pass the bold font name, so the registry is keyed by
+    (font, bold, text color) without needing a separate flag.
+    """
+    key = (font_name, text_color.hexval())
+    style = _cell_styles.get(key)
+    if style is None:
+        normal = get_sample_styles()["Normal"]
+        with _style_lock:
+            style = _cell_styles.get(key)
+            if style is None:
+                style = ParagraphStyle(
+                    f"CellStyle_{font_name}_{key[1]}",
+                    parent=normal,
+                    fontSize=12,
+                    fontName=font_name,
+                    alignment=TA_CENTER,
+                    textColor=text_color,
+                    leading=14,
+                    wordWrap="CJK",
+                )
+                _cell_styles[key] = style
+    return style
+
+
+class ReportTemplate:
+    """Static parts of the report layout, built once per process.
+
+    Holds the page geometry, the title, subtitle and legend styles, the
+    legend's table style and the attendance table's base style. A render
+    only adds its rows and per-cell overrides. Nothing here changes after
+    it is built, so threads share one template; it also pickles, though
+    worker processes normally build (or inherit) their own.
+    """
+
+    PAGE_SIZE = letter
+    MARGINS = {
+        "rightMargin": 0.3 * inch,
+        "leftMargin": 0.3 * inch,
+        "topMargin": 0.4 * inch,
+        "bottomMargin": 0.4 * inch,
+    }
+    LEGEND_ROWS = (
+        ("", "THE YELLOW COLOR INDICATES ABSENTEEISM"),
+        ("", "THE RED COLOR INDICATES LATE COMERS"),
+    )
+    EARLY_LEGEND_ROW = ("", "THE BLUE COLOR INDICATES EARLY CHECK-OUTS")
+    LEGEND_COL_WIDTHS = (0.3 * inch, 5.0 * inch)
+
+    def __init__(self, font_name, font_name_bold):
+        styles = get_sample_styles()
+        self.title_style = ParagraphStyle(
+            "CustomTitle",
+            parent=styles["Heading1"],
+            fontSize=14,
+            textColor=colors.black,
+            spaceAfter=2,
+            alignment=TA_CENTER,
+            fontName=font_name_bold,
+        )
+        self.subtitle_style = ParagraphStyle(
+            "CustomSubtitle",
+            parent=styles["Normal"],
+            fontSize=14,
+            textColor=colors.black,
+            spaceBefore=0,
+            spaceAfter=10,
+            alignment=TA_CENTER,
+            fontName=font_name_bold,
+        )
+        self.legend_style = ParagraphStyle(
+            "Legend",
+            parent=styles["Normal"],
+            fontSize=12,
+            textColor=colors.black,
+            fontName=font_name_bold,
+            spaceAfter=2,
+            alignment=TA_CENTER,
+        )
+        self.legend_table_style = TableStyle(
+            [
+                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+                ("FONTNAME", (0, 0), (-1, -1), font_name),
+                ("FONTSIZE", (0, 0), (-1, -1), 12),
+                ("BACKGROUND", (0, 0), (0, 0), ABSENT_BACKGROUND),
+                ("BACKGROUND", (0, 1), (0, 1), LATE_TEXT_COLOR),
+                ("TEXTCOLOR", (0, 1), (0, 1), colors.white),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("LEFTPADDING", (0, 0), (-1, -1), 3),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 3),
+                ("TOPPADDING", (0, 0), (-1, -1), 2),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+            ]
+        )
+        self.early_legend_table_style = TableStyle(
+            [
+                ("BACKGROUND", (0, 2), (0, 2), EARLY_TEXT_COLOR),
+                ("TEXTCOLOR", (0, 2), (0, 2), colors.white),
+            ],
+            parent=self.legend_table_style,
+        )
+        # Attendance table style for tables starting on an even and on an
+        # odd row, so continued tables keep the zebra stripes in step
+        self.table_styles = (
+            TableStyle(self._table_commands([colors.white, STRIPE_BACKGROUND])),
+            TableStyle(self._table_commands([STRIPE_BACKGROUND, colors.white])),
+        )
+
+    @staticmethod
+    def _table_commands(row_colors):
+        # Calibri font and size 12 come from the cell styles
+        return [
+            ("BACKGROUND", (0, 0), (-1, 0), HEADER_BACKGROUND),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("BOTTOMPADDING", (0, 0), (-1, 0), 6),
+            ("TOPPADDING", (0, 0), (-1, 0), 6),
+            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+            ("BOX", (0, 0), (-1, -1), 1.5, colors.black),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1), row_colors),
+            ("LEFTPADDING", (0, 0), (-1, -1), 4),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+            ("TOPPADDING", (0, 1), (-1, -1), 5),
+            ("BOTTOMPADDING", (0, 1), (-1, -1), 5),
+        ]
+
+    def document(self, pdf_buffer):
+        """The report page writing into pdf_buffer"""
+        return SimpleDocTemplate(pdf_buffer, pagesize=self.PAGE_SIZE, **self.MARGINS)
+
+    def header(self, title, subtitle):
+        """Title and (if any) subtitle paragraphs"""
+        story = [Paragraph(title, self.title_style)]
+        if subtitle:
+            story.append(Paragraph(subtitle, self.subtitle_style))
+        return story
+
+    def legend(self, early_check_outs=False):
+        """Spacer, "NOTE:" and color legend that follow the table
+
+        The early check-out row is only added for reports that have some.
+        """
+        rows = list(self.LEGEND_ROWS)
+        style = self.legend_table_style
+        if early_check_outs:
+            rows.append(self.EARLY_LEGEND_ROW)
+            style = self.early_legend_table_style
+        legend_table = Table(
+            [list(row) for row in rows],
+            colWidths=list(self.LEGEND_COL_WIDTHS),
+        )
+        legend_table.setStyle(style)
+        return [
+            Spacer(1, 0.15 * inch),
+            Paragraph("NOTE:", self.legend_style),
+            legend_table,
+        ]
+
+    def table_style(self, overrides, odd_first_row=False):
+        """Base attendance table style plus per-cell override commands"""
+        return TableStyle(overrides, parent=self.table_styles[odd_first_row])
+
+
+def get_report_template():
+    """The report template for the report fonts, built once per process"""
+    global _report_template
+    if _report_template is None:
+        # Built outside the lock: get_sample_styles() takes it too
+        template = ReportTemplate(REPORT_FONT, REPORT_FONT_BOLD)
+        with _style_lock:
+            if _report_template is None:
+                _report_template = template
+    return _report_template
+
+
+# Columns shown in the report, in display order
+PREFERRED_COLUMNS = [
+    "EmployeeName",
+    "DepartmentName",
+    "AttendanceDate",
+    "ActualCheckIn",
+    "ActualCheckOut",
+    "DayOff",
+]
+
+
+def select_display_columns(columns):
+    """Preferred columns present among a sheet's columns, else its first 6"""
+    display_columns = [col for col in PREFERRED_COLUMNS if col in columns]
+    if not display_columns:
+        display_columns = list(columns)[:6]
+    return display_columns
+
+
+def report_column_widths(display_columns):
+    """Fixed table column widths, wide enough to keep most cells on one line"""
+    col_widths = []
+    for col in display_columns:
+        if col == "EmployeeName":
+            col_widths.append(1.8 * inch)
+        elif col == "DepartmentName":
+            # Fixed width for department to ensure single line
+            col_widths.append(2.2 * inch)
+        elif col == "AttendanceDate":
+            col_widths.append(1.15 * inch)
+        elif col == "ActualCheckIn":
+            col_widths.append(1.15 * inch)
+        elif col == "ActualCheckOut":
+            col_widths.append(1.15 * inch)
+        else:
+            col_widths.append(0.85 * inch)
+    return col_widths
+
+
+def generate_attendance_pdf(
+    pdf_buffer,
+    sheet,
+    title,
+    subtitle,
+    report_date=None,
+    render_mode="standard",
+    stats=None,
+):
+    """Generate PDF with attendance data and color coding
+
+    sheet is a ReportSheet or a DataFrame read from an export. render_mode
+    "fast" draws the table straight onto the canvas instead of laying out a
+    platypus Table of Paragraphs; the page looks the same. Stage timings
+    are added to stats when given.
+    """
+    with timed(stats, "table_build"):
+        story = build_report_story(sheet, title, subtitle, render_mode)
+
+    # Build PDF
+    with timed(stats, "pdf_build"):
+        report_document(pdf_buffer).build(story)
+
+
+def report_document(pdf_buffer):
+    """The letter-size report page writing into pdf_buffer"""
+    return get_report_template().document(pdf_buffer)
+
+
+def build_report_story(sheet, title, subtitle, render_mode="standard"):
+    """Flowables for the report: titles, attendance table and legend
+
+    sheet is a ReportSheet, or a DataFrame that is turned into one first.
+    """
+    if isinstance(sheet, pd.DataFrame):
+        sheet = build_report_sheet(sheet)
+
+    template = get_report_template()
+    story = template.header(title, subtitle)
+
+    # Calibri (or a metric-compatible substitute) when installed, else Helvetica
+    font_name = REPORT_FONT
+    font_name_bold = REPORT_FONT_BOLD
+
+    display_columns = sheet.columns
+
+    # Ensure table has data
+    if len(sheet) == 0:
+        raise ValueError("Excel file has no data rows")
+
+    # Absent/late/early flags and display text for every row, decided when
+    # the sheet was built
+    absent = sheet.flags(ABSENT)
+    late = sheet.flags(LATE)
+    early = sheet.flags(EARLY_CHECK_OUT)
+    column_text = sheet.column_text()
+
+    col_widths = report_column_widths(display_columns)
+    if render_mode == "fast":
+        table = AttendanceGrid(
+            display_columns,
+            column_text,
+            absent,
+            late,
+            early,
+            col_widths,
+            font_name,
+            font_name_bold,
+        )
+    elif render_mode == "chunked":
+        table = ChunkedAttendanceTable(
+            display_columns,
+            column_text,
+            absent,
+            late,
+            early,
+            col_widths,
+            font_name,
+            font_name_bold,
+            RENDER_CHUNK_ROWS,
+        )
+    else:
+        table = _paragraph_table(
+            display_columns,
+            column_text,
+            absent,
+            late,
+            early,
+            col_widths,
+            font_name,
+            font_name_bold,
+        )
+    story.append(table)
+
+    story.extend(template.legend(early_check_outs=bool(early.any())))
+    return story
+
+
+def _paragraph_table(
+    display_columns,
+    column_text,
+    absent,
+    late,
+    early,
+    col_widths,
+    font_name,
+    font_name_bold,
+):
+    """platypus Table of wrapped Paragraphs (the standard render mode)"""
+    # Shared cell styles for wrapped text
+    cell_styles = _row_cell_styles(font_name, font_name_bold)
+
+    # Prepare table data with Paragraph-wrapped headers
+    table_data = [_paragraph_header(display_columns, font_name_bold)]
+
+    check_columns = _check_columns(display_columns)
+
+    # Data rows with color coding (red bold text for late comers, blue bold
+    # for early check-outs)
+    for row_pos, values in enumerate(zip(*column_text)):
+        table_data.append(
+            _paragraph_row(
+                values, late[row_pos], early[row_pos], check_columns, cell_styles
+            )
+        )
+
+    table = Table(table_data, colWidths=col_widths)
+    table.setStyle(_paragraph_table_style(check_columns[0], absent))
+    return table
+
+
+def _check_columns(display_columns):
+    # Positions of the check-in and check-out columns, -1 when not shown
+    return tuple(
+        display_columns.index(col) if col in display_columns else -1
+        for col in ("ActualCheckIn", "ActualCheckOut")
+    )
+
+
+def _row_cell_styles(font_name, font_name_bold):
+    # Plain, late check-in and early check-out cell styles
+    return (
+        get_cell_style(font_name),
+        get_cell_style(font_name_bold, LATE_TEXT_COLOR),
+        get_cell_style(font_name_bold, EARLY_TEXT_COLOR),
+    )
+
+
+def _paragraph_header(display_columns, font_name_bold):
+    cell_style_bold = get_cell_style(font_name_bold)
+    return [Paragraph(str(col), cell_style_bold) for col in display_columns]
+
+
+def _paragraph_row(values, is_late, is_early, check_columns, cell_styles):
+    cell_style, cell_style_late, cell_style_early = cell_styles
+    check_in_col, check_out_col = check_columns
+    row_data = [Paragraph(value, cell_style) for value in values]
+    if check_in_col >= 0 and is_late:
+        row_data[check_in_col] = Paragraph(values[check_in_col], cell_style_late)
+    if check_out_col >= 0 and is_early:
+        row_data[check_out_col] = Paragraph(values[check_out_col], cell_style_early)
+    return row_data
+
+
+def _paragraph_table_style(check_in_col, absent, odd_first_row=False):
+    """TableStyle for a header row followed by the rows in absent
+
+    odd_first_row keeps the zebra stripes in step when a table continues
+    the rows of a previous one.
+    """
+    # Apply cell-specific colors for check-in column
+    overrides = []
+    if check_in_col >= 0:
+        # Apply background color (yellow for absent)
+        for row_idx in np.flatnonzero(absent) + 1:
+            overrides.append(
+                (
+                    "BACKGROUND",
+                    (check_in_col, int(row_idx)),
+                    (check_in_col, int(row_idx)),
+                    ABSENT_BACKGROUND,
+                )
+            )
+    return get_report_template().table_style(overrides, odd_first_row)
+
+
+class ChunkedAttendanceTable(Flowable):
+    """Standard table laid out a chunk of rows at a time (the chunked render mode).
+
+    Only chunk_rows rows of Paragraphs exist at once. Each page gets its own
+    Table holding a header row and the rows that fit; the rows left over
+    are handed back to platypus as a new ChunkedAttendanceTable, so tables
+    already drawn can be freed and peak memory stays flat however long the
+    sheet is. Unlike the standard table, every page repeats the header.
+    """
+
+    H_PADDING = 4
+    HEADER_PADDING = 6
+    ROW_PADDING = 5
+
+    def __init__(
+        self,
+        display_columns,
+        column_text,
+        absent,
+        late,
+        early,
+        col_widths,
+        font_name,
+        font_name_bold,
+        chunk_rows,
+        start=0,
+        pending=None,
+    ):
+        super().__init__()
+        self.display_columns = display_columns
+        self.column_text = column_text
+        self.absent = absent
+        self.late = late
+        self.early = early
+        self.col_widths = col_widths
+        self.font_name = font_name
+        self.font_name_bold = font_name_bold
+        self.chunk_rows = max(1, chunk_rows)
+        self.check_columns = _check_columns(display_columns)
+        # Position of the first row not yet placed on a page, the laid out
+        # (paragraphs, height) rows from there on, and the next row to lay out
+        self.start = start
+        self.pending = pending if pending is not None else deque()
+        self.next_row = start + len(self.pending)
+
+    def _row_height(self, cells, padding):
+        height = 0
+        for cell, width in zip(cells, self.col_widths):
+            _, cell_height = cell.wrap(width - 2 * self.H_PADDING, 1e9)
+            height = max(height, cell_height)
+        return height + 2 * padding
+
+    def _fill(self):
+        """Lay out rows until chunk_rows are pending (or none are left)"""
+        cell_styles = _row_cell_styles(self.font_name, self.font_name_bold)
+        total_rows = len(self.absent)
+        while len(self.pending) < self.chunk_rows and self.next_row < total_rows:
+            cells = _paragraph_row(
+                [text[self.next_row] for text in self.column_text],
+                self.late[self.next_row],
+                self.early[self.next_row],
+                self.check_columns,
+                cell_styles,
+            )
+            self.pending.append((cells, self._row_height(cells, self.ROW_PADDING)))
+            self.next_row += 1
+
+    def wrap(self, availWidth, availHeight):
+        # Always ask to be split; split() hands out one page-sized Table
+        return sum(self.col_widths), availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        header = _paragraph_header(self.display_columns, self.font_name_bold)
+        height = self._row_height(header, self.HEADER_PADDING)
+
+        rows = []
+        while True:
+            if not self.pending:
+                self._fill()
+                if not self.pending:
+                    break
+            _cells, row_height = self.pending[0]
+            if height + row_height > availHeight:
+                break
+            height += row_height
+            rows.append(self.pending.popleft()[0])
+
+        if not rows:
+            # Not even one row fits; try again in the next frame
+            return []
+
+        stop = self.start + len(rows)
+        table = Table([header] + rows, colWidths=self.col_widths, repeatRows=1)
+        table.setStyle(
+            _paragraph_table_style(
+                self.check_columns[0],
+                self.absent[self.start : stop],
+                odd_first_row=self.start % 2 == 1,
+            )
+        )
+        if stop == len(self.absent):
+            return [table]
+        rest = ChunkedAttendanceTable(
+            self.display_columns,
+            self.column_text,
+            self.absent,
+            self.late,
+            self.early,
+            self.col_widths,
+            self.font_name,
+            self.font_name_bold,
+            self.chunk_rows,
+            stop,
+            self.pending,
+        )
+        return [table, rest]
+
+
+class AttendanceGrid(Flowable):
+    """Attendance table drawn straight onto the canvas (the fast render mode).
+
+    Matches the look of the standard Table (grey header, zebra rows, yellow
+    absent cells, red bold late check-ins, blue bold early check-outs) but
+    skips Paragraph layout: column widths are fixed, every row height is
+    computed once up front and page splits are a binary search over the
+    running row heights. Like the standard table, the header row only
+    appears on the first page.
+    """
+
+    FONT_SIZE = 12
+    LEADING = 14
+    H_PADDING = 4
+    HEADER_PADDING = 6
+    ROW_PADDING = 5
+
+    _SHARED = (
+        "hAlign",
+        "col_widths",
+        "font_name",
+        "font_name_bold",
+        "absent",
+        "late",
+        "early",
+        "check_in_col",
+        "check_out_col",
+        "header_lines",
+        "header_height",
+        "row_lines",
+        "offsets",
+    )
+
+    def __init__(
+        self,
+        display_columns,
+        column_text,
+        absent,
+        late,
+        early,
+        col_widths,
+        font_name,
+        font_name_bold,
+    ):
+        super().__init__()
+        self.hAlign = "CENTER"
+        self.col_widths = col_widths
+        self.font_name = font_name
+        self.font_name_bold = font_name_bold
+        self.absent = absent
+        self.late = late
+        self.early = early
+        self.check_in_col, self.check_out_col = _check_columns(display_columns)
+        self.header_lines, self.header_height, self.row_lines, self.offsets = (
+            self._layout(display_columns, column_text)
+        )
+        # Rows [start, stop) are drawn by this part of a split table
+        self.start = 0
+        self.stop = len(self.row_lines)
+
+    def _layout(self, display_columns, column_text):
+        """Wrap every cell once and precompute the running row heights"""
+        text_widths = [width - 2 * self.H_PADDING for width in self.col_widths]
+
+        header_lines = [
+            _wrap_cell_text(str(col), self.font_name_bold, self.FONT_SIZE, width)
+            for col, width in zip(display_columns, text_widths)
+        ]
+        header_height = (
+            max(len(lines) for lines in header_lines) * self.LEADING
+            + 2 * self.HEADER_PADDING
+        )
+
+        # Most cells fit on one line, so only the overflowing ones get wrapped
+        row_lines = []
+        heights = np.empty(len(column_text[0]), dtype=float)
+        for row_pos, values in enumerate(zip(*column_text)):
+            bold = {col_pos for col_pos, _ in self._highlights(row_pos)}
+            lines = []
+            for col_pos, (value, width) in enumerate(zip(values, text_widths)):
+                font = self.font_name
+                if col_pos in bold:
+                    font = self.font_name_bold
+                lines.append(_wrap_cell_text(value, font, self.FONT_SIZE, width))
+            row_lines.append(lines)
+            heights[row_pos] = (
+                max(len(cell) for cell in lines) * self.LEADING + 2 * self.ROW_PADDING
+            )
+
+        offsets = np.concatenate(([0.0], np.cumsum(heights)))
+        return header_lines, header_height, row_lines, offsets
+
+    def _part(self, start, stop):
+        # Shares the precomputed layout; platypus bookkeeping is not copied
+        part = AttendanceGrid.__new__(AttendanceGrid)
+        Flowable.__init__(part)
+        for name in self._SHARED:
+            setattr(part, name, getattr(self, name))
+        part.start, part.stop = start, stop
+        return part
+
+    @property
+    def _header_shown(self):
+        return self.start == 0
+
+    def wrap(self, availWidth, availHeight):
+        self.width = sum(self.col_widths)
+        self.height = self.offsets[self.stop] - self.offsets[self.start]
+        if self._header_shown:
+            self.height += self.header_height
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        header_height = self.header_height if self._header_shown else 0
+        limit = self.offsets[self.start] + availHeight - header_height
+        fits = int(np.searchsorted(self.offsets, limit, side="right")) - 1
+        fits = min(fits, self.stop)
+        if fits <= self.start:
+            return []
+        if fits >= self.stop:
+            return [self]
+        return [self._part(self.start, fits), self._part(fits, self.stop)]
+
+    def draw(self):
+        canv = self.canv
+        x_edges = np.concatenate(([0.0], np.cumsum(self.col_widths))).tolist()
+        top = self.height
+
+        # Row boundaries (y of each row's top edge) on this page, top down
+        row_tops = []
+        y = top
+        if self._header_shown:
+            row_tops.append(y)
+            y -= self.header_height
+        first_row_top = y
+        row_tops.extend(
+            (
+                first_row_top
+                - (self.offsets[self.start : self.stop] - self.offsets[self.start])
+            ).tolist()
+        )
+
+        # Backgrounds: grey header, zebra rows, yellow absent check-ins
+        canv.saveState()
+        if self._header_shown:
+            canv.setFillColor(HEADER_BACKGROUND)
+            canv.rect(
+                0,
+                top - self.header_height,
+                self.width,
+                self.header_height,
+                stroke=0,
+                fill=1,
+            )
+        data_tops = row_tops[1:] if self._header_shown else row_tops
+        for row_pos, row_top in zip(range(self.start, self.stop), data_tops):
+            height = self.offsets[row_pos + 1] - self.offsets[row_pos]
+            if row_pos % 2 == 1:
+                canv.setFillColor(STRIPE_BACKGROUND)
+                canv.rect(0, row_top - height, self.width, height, stroke=0, fill=1)
+            if self.check_in_col >= 0 and self.absent[row_pos]:
+                canv.setFillColor(ABSENT_BACKGROUND)
+                canv.rect(
+                    x_edges[self.check_in_col],
+                    row_top - height,
+                    self.col_widths[self.check_in_col],
+                    height,
+                    stroke=0,
+                    fill=1,
+                )
+
+        # Cell text, centred and top aligned like the Paragraph cells
+        if self._header_shown:
+            canv.setFillColor(colors.black)
+            self._draw_row(
+                self.header_lines,
+                top - self.HEADER_PADDING,
+                x_edges,
+                self.font_name_bold,
+            )
+        for row_pos, row_top in zip(range(self.start, self.stop), data_tops):
+            canv.setFillColor(colors.black)
+            lines = self.row_lines[row_pos]
+            highlights = self._highlights(row_pos)
+            if highlights:
+                self._draw_row(
+                    lines,
+                    row_top - self.ROW_PADDING,
+                    x_edges,
+                    self.font_name,
+                    skip={col_pos for col_pos, _ in highlights},
+                )
+                for col_pos, color in highlights:
+                    canv.setFillColor(color)
+                    self._draw_cell(
+                        lines[col_pos],
+                        row_top - self.ROW_PADDING,
+                        x_edges[col_pos],
+                        self.col_widths[col_pos],
+                        self.font_name_bold,
+                    )
+            else:
+                self._draw_row(
+                    lines, row_top - self.ROW_PADDING, x_edges, self.font_name
+                )
+
+        # Grid lines, then the heavier outer box
+        canv.setStrokeColor(colors.black)
+        canv.setLineWidth(1)
+        bottom = 0
+        grid = [(x, bottom, x, top) for x in x_edges]
+        grid.extend((0, y, self.width, y) for y in row_tops + [bottom])
+        canv.lines(grid)
+        canv.setLineWidth(1.5)
+        canv.rect(0, 0, self.width, top, stroke=1, fill=0)
+        canv.restoreState()
+
+    def _highlights(self, row_pos):
+        # (column, color) of the bold colored cells of a row
+        highlights = []
+        if self.check_in_col >= 0 and self.late[row_pos]:
+            highlights.append((self.check_in_col, LATE_TEXT_COLOR))
+        if self.check_out_col >= 0 and self.early[row_pos]:
+            highlights.append((self.check_out_col, EARLY_TEXT_COLOR))
+        return highlights
+
+    def _draw_row(self, lines, text_top, x_edges, font_name, skip=()):
+        for col_pos, cell_lines in enumerate(lines):
+            if col_pos not in skip:
+                self._draw_cell(
+                    cell_lines,
+                    text_top,
+                    x_edges[col_pos],
+                    self.col_widths[col_pos],
+                    font_name,
+                )
+
+    def _draw_cell(self, cell_lines, text_top, x, width, font_name):
+        canv = self.canv
+        canv.setFont(font_name, self.FONT_SIZE)
+        baseline = text_top - self.FONT_SIZE
+        for line in cell_lines:
+            if line:
+                canv.drawCentredString(x + width / 2, baseline, line)
+            baseline -= self.LEADING
+
+
+def _wrap_cell_text(text, font_name, font_size, width):
+    """Split cell text into lines no wider than width (like a Paragraph cell)"""
+    # Paragraphs collapse runs of whitespace
+    text = " ".join(text.split())
+    if stringWidth(text, font_name, font_size) <= width:
+        return [text]
+
+    lines = []
+    line = ""
+    for word in text.split(" "):
+        candidate = f"{line} {word}" if line else word
+        if stringWidth(candidate, font_name, font_size) <= width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        # Words wider than the cell are broken between characters
+        line = ""
+        for char in word:
+            if line and stringWidth(line + char, font_name, font_size) > width:
+                lines.append(line)
+                line = ""
+            line += char
+    lines.append(line)
+    return lines
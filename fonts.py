@@ -0,0 +1,66 @@
+import os
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+# Report font families in order of preference: (name, regular file, bold file).
+# Carlito is metric-compatible with Calibri and ships with most Linux distros.
+FONT_CANDIDATES = [
+    ("Calibri", "calibri.ttf", "calibrib.ttf"),
+    ("Carlito", "Carlito-Regular.ttf", "Carlito-Bold.ttf"),
+]
+
+# Built-in PDF fonts used when none of the candidates can be found
+FALLBACK_FONTS = ("Helvetica", "Helvetica-Bold")
+
+DEFAULT_FONT_DIRS = [
+    "C:/Windows/Fonts",
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    "/Library/Fonts",
+]
+
+# Extra font directories, separated like PATH (searched before the defaults)
+FONT_PATH = [p for p in os.environ.get("FONT_PATH", "").split(os.pathsep) if p]
+
+
+def _find_font_files(search_path):
+    """Map lower-cased font file names to their full paths"""
+    found = {}
+    for folder in search_path:
+        for root, _, files in os.walk(folder):
+            for name in files:
+                found.setdefault(name.lower(), os.path.join(root, name))
+    return found
+
+
+def resolve_fonts(search_path=None):
+    """Register the first available report font family.
+
+    Returns (regular, bold) font names usable in reportlab styles, falling
+    back to Helvetica when no candidate family is installed.
+    """
+    if search_path is None:
+        search_path = FONT_PATH + DEFAULT_FONT_DIRS
+    font_files = _find_font_files(search_path)
+
+    for family, regular_file, bold_file in FONT_CANDIDATES:
+        regular_path = font_files.get(regular_file.lower())
+        bold_path = font_files.get(bold_file.lower())
+        if not regular_path or not bold_path:
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(family, regular_path))
+            pdfmetrics.registerFont(TTFont(f"{family}-Bold", bold_path))
+        except Exception:
+            # Unreadable or broken font file, try the next family
+            continue
+        return family, f"{family}-Bold"
+
+    return FALLBACK_FONTS
+
+
+# Resolved once per process; every render reuses these names
+REPORT_FONT, REPORT_FONT_BOLD = resolve_fonts()
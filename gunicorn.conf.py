@@ -0,0 +1,29 @@
+"""gunicorn settings, read from the working directory (`gunicorn app:app`)"""
+
+import os
+
+# Import the app once in the master and warm the converter up there, so
+# every worker (including ones started after a max_requests recycle) is
+# forked ready to convert and shares the loaded modules' memory
+preload_app = os.environ.get("WARM_UP", "1") == "1"
+
+# Jobs, caches and admission lanes live in each worker process; see README
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# Threaded workers with as many request threads as run_production.py gives
+# waitress (more than the admission lanes' slots together), so job status
+# polls and busy answers are served while conversions run. Computed from
+# the environment like app's lane settings, without importing app here
+worker_class = "gthread"
+_lane_slots = int(os.environ.get("SMALL_LANE_SLOTS", "4")) + int(
+    os.environ.get("LARGE_LANE_SLOTS", "1")
+)
+threads = int(os.environ.get("SERVER_THREADS", str(_lane_slots + 4)))
+
+
+def when_ready(server):
+    if preload_app:
+        import converter
+
+        converter.warm_up()
+        server.log.info("Converter warmed up in the master")
@@ -0,0 +1,97 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+
+class Job:
+    """State of one background conversion, as shown by the status endpoint"""
+
+    def __init__(self, kind, total):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.total = total
+        self.done = 0
+        self.current_file = None
+        self.errors = []
+        self.error = None
+        self.result_path = None
+        self.result_filename = None
+        self.mimetype = None
+        self.upload_id = None
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "current_file": self.current_file,
+            "errors": list(self.errors),
+            "error": self.error,
+            "result_filename": self.result_filename,
+            "upload_id": self.upload_id,
+        }
+
+
+class JobQueue:
+    """Runs conversions on a small local thread pool and tracks their progress.
+
+    Finished jobs, and their result files, are dropped ttl seconds after
+    they complete.
+    """
+
+    def __init__(self, max_workers, ttl):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._jobs = {}
+        self._lock = Lock()
+
+    def submit(self, kind, total, fn, *args):
+        """Queue fn(job, *args); it fills in the job's progress and result"""
+        self._prune()
+        job = Job(kind, total)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args):
+        job.status = "running"
+        try:
+            fn(job, *args)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.current_file = None
+            job.finished = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                job
+                for job in self._jobs.values()
+                if job.finished is not None and job.finished < cutoff
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.result_path:
+                try:
+                    os.remove(job.result_path)
+                except OSError:
+                    pass
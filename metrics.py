@@ -0,0 +1,226 @@
+"""Conversion timings and counters, exposed in Prometheus text format"""
+
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+log = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Per-conversion stages recorded by the converter, in pipeline order
+STAGES = ("parse", "cleanup", "table_build", "pdf_build", "io")
+
+
+def _format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"),
+        )
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic total, optionally split by label values"""
+
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Observation counts in cumulative buckets, plus their sum and count"""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values = {}
+        self._lock = Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def _lines(self):
+        with self._lock:
+            values = sorted((key, (list(c), s)) for key, (c, s) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric._lines())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONVERSIONS = REGISTRY.register(
+    Counter(
+        "attendance_conversions_total",
+        "Files converted, by request kind and outcome",
+        ("kind", "outcome"),
+    )
+)
+CONVERSION_SECONDS = REGISTRY.register(
+    Histogram(
+        "attendance_conversion_seconds",
+        "Time to convert one file, by request kind",
+        ("kind",),
+    )
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "attendance_stage_seconds",
+        "Time spent in each conversion stage",
+        ("stage",),
+    )
+)
+ROWS = REGISTRY.register(
+    Counter("attendance_rows_total", "Attendance rows rendered into reports")
+)
+PDF_BYTES = REGISTRY.register(
+    Counter("attendance_pdf_bytes_total", "Bytes of PDF produced or served")
+)
+RETENTION_FILES = REGISTRY.register(
+    Counter(
+        "attendance_retention_deleted_total",
+        "Uploads and outputs deleted, by folder and reason",
+        ("folder", "reason"),
+    )
+)
+RETENTION_BYTES = REGISTRY.register(
+    Counter(
+        "attendance_retention_reclaimed_bytes_total",
+        "Disk space reclaimed by deleting uploads and outputs",
+        ("folder", "reason"),
+    )
+)
+LANE_ACTIVE = REGISTRY.register(
+    Gauge(
+        "attendance_lane_active_requests",
+        "Conversions holding an admission slot, by lane",
+        ("lane",),
+    )
+)
+LANE_REJECTIONS = REGISTRY.register(
+    Counter(
+        "attendance_lane_rejections_total",
+        "Requests turned away because their lane was full",
+        ("lane",),
+    )
+)
+
+
+@contextmanager
+def timed(stats, stage):
+    """Add the time spent in the block to stats[stage] (if stats is given)"""
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats[stage] = stats.get(stage, 0.0) + time.perf_counter() - start
+
+
+def record_conversion(kind, filename, outcome, seconds, stats=None, pdf_bytes=0):
+    """Count one converted file and log its stage timings"""
+    stats = stats or {}
+    CONVERSIONS.inc(kind=kind, outcome=outcome)
+    CONVERSION_SECONDS.observe(seconds, kind=kind)
+    for stage in STAGES:
+        if stage in stats:
+            STAGE_SECONDS.observe(stats[stage], stage=stage)
+    ROWS.inc(stats.get("rows", 0))
+    PDF_BYTES.inc(pdf_bytes)
+
+    if log.isEnabledFor(logging.INFO):
+        fields = " ".join(
+            f"{stage}={stats[stage]:.3f}" for stage in STAGES if stage in stats
+        )
+        log.info(
+            "conversion kind=%s file=%r outcome=%s seconds=%.3f rows=%d pdf_bytes=%d %s",
+            kind,
+            filename,
+            outcome,
+            seconds,
+            stats.get("rows", 0),
+            pdf_bytes,
+            fields,
+        )
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import uuid
+from threading import Lock
+
+# Bump when the report layout changes so stale PDFs are not served
+CACHE_VERSION = "1"
+
+
+def upload_digest(source):
+    """Hex sha256 of an upload (a path or binary file object)"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    digest = hashlib.file_digest(source, "sha256").hexdigest()
+    source.seek(0)
+    return digest
+
+
+class PdfCache:
+    """Content-addressed on-disk store of rendered PDFs with LRU eviction.
+
+    Entries are keyed by a hash of the uploaded bytes plus everything that
+    affects the rendered output, so re-submitting the same workbook with the
+    same options skips parsing and rendering entirely. The least recently
+    used entries are evicted once the store grows past max_bytes.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+        # key -> size in bytes, ordered from least to most recently used
+        self._entries = {}
+        self._size = 0
+        if self.enabled:
+            os.makedirs(folder, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _load_index(self):
+        # Rebuild recency order from modification times left by earlier runs
+        found = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".pdf"):
+                stat = os.stat(os.path.join(self.folder, name))
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.pdf")
+
+    @staticmethod
+    def digest_key(upload_id, **render_inputs):
+        """Hash of an upload (its upload_digest()) and render inputs"""
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        digest.update(bytes.fromhex(upload_id))
+        for name in sorted(render_inputs):
+            digest.update(f"\0{name}={render_inputs[name]}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Cached PDF bytes for key, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            # Mark as most recently used
+            self._entries[key] = self._entries.pop(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            # Removed behind our back (e.g. by another worker's eviction)
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store a rendered PDF, evicting least recently used entries"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        # Unique per call: threads of one process may store the same key
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._size += len(data)
+            evicted = []
+            while self._size > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._size -= self._entries.pop(old_key)
+                self.evictions += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+            }
@@ -0,0 +1,81 @@
+import sys
+
+import numpy as np
+
+# Per-row status flags held in ReportSheet.status (a row can be late and
+# leave early)
+NORMAL = 0
+ABSENT = 1
+LATE = 2
+EARLY_CHECK_OUT = 4
+
+
+class ReportSheet:
+    """The rows of one sheet as the report shows them, and nothing else.
+
+    columns are the display column names. Every column is dictionary
+    encoded: values[i] holds the distinct display strings of column i and
+    codes[i] (an unsigned integer array, as narrow as the number of values
+    allows) the position in values[i] of each row's text. extra holds
+    columns the attendance rules read but the report does not show, as
+    {name: (values, codes)}. status holds the flags of each row: ABSENT,
+    LATE and EARLY_CHECK_OUT, or NORMAL for none.
+
+    Dates, departments and times repeat from row to row, so a sheet takes a
+    fraction of the memory of its DataFrame, and pickling it (to the batch
+    pool) writes a few flat arrays plus each distinct string once. Sheets
+    are never changed after they are built, so threads can share them.
+    """
+
+    __slots__ = ("codes", "columns", "extra", "status", "values")
+
+    def __init__(self, columns, values, codes, status, extra=None):
+        self.columns = list(columns)
+        self.values = list(values)
+        self.codes = list(codes)
+        self.status = status
+        self.extra = extra or {}
+
+    def __reduce__(self):
+        return ReportSheet, (
+            self.columns,
+            self.values,
+            self.codes,
+            self.status,
+            self.extra,
+        )
+
+    def __len__(self):
+        return len(self.status)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the sheet"""
+        columns = list(zip(self.values, self.codes)) + list(self.extra.values())
+        size = self.status.nbytes
+        for values, codes in columns:
+            size += codes.nbytes + sys.getsizeof(values)
+            size += sum(map(sys.getsizeof, values))
+        return size
+
+    def column(self, name):
+        """(values, codes) of a shown or extra column, or None if absent"""
+        if name in self.columns:
+            position = self.columns.index(name)
+            return self.values[position], self.codes[position]
+        return self.extra.get(name)
+
+    def column_text(self):
+        """Display text per column, one list of strings each"""
+        return [
+            np.asarray(values, dtype=object)[codes].tolist()
+            for values, codes in zip(self.values, self.codes)
+        ]
+
+    def flags(self, flag):
+        """Boolean array marking the rows with the given status flag"""
+        return (self.status & flag) != 0
+
+    def with_status(self, status):
+        """The same sheet with other status flags (the columns are shared)"""
+        return ReportSheet(self.columns, self.values, self.codes, status, self.extra)
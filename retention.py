@@ -0,0 +1,163 @@
+import logging
+import os
+import shutil
+import time
+from threading import Event, Lock, Thread
+
+log = logging.getLogger(__name__)
+
+
+def _entry_stat(path):
+    """(newest mtime, total bytes) of a file, or of everything in a folder"""
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_mtime, stat.st_size
+    newest = os.stat(path).st_mtime
+    size = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            newest = max(newest, stat.st_mtime)
+            size += stat.st_size
+    return newest, size
+
+
+class RetentionManager:
+    """Deletes old files from the upload and output folders in the background.
+
+    Every interval seconds the folders are scanned. Each top-level entry
+    (a file, or a folder such as a batch's PDFs, taken as a whole) last
+    written more than max_age seconds ago is deleted, then the oldest
+    remaining entries until all of them together fit in max_bytes. Entries
+    younger than min_age are never deleted, so files still being written
+    are safe; files a conversion still needs (however old) are pin()ned
+    until remove(). Excluded paths (stores that manage their own size) and
+    dotfiles such as .gitkeep are left alone. A limit of 0 is no limit.
+
+    on_delete(folder, reason, size) is called for every deleted entry.
+    """
+
+    def __init__(
+        self,
+        folders,
+        max_age,
+        max_bytes,
+        interval,
+        min_age=300,
+        exclude=(),
+        on_delete=None,
+    ):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.min_age = min_age
+        self.exclude = {os.path.abspath(path) for path in exclude}
+        self.on_delete = on_delete
+        self._lock = Lock()
+        # Paths in use, never swept; guarded by their own lock so pinning
+        # does not wait for a sweep
+        self._pinned = set()
+        self._pinned_lock = Lock()
+        self._stop = Event()
+        # Process running the sweeper thread (forked children start their own)
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return self.interval > 0 and (self.max_age > 0 or self.max_bytes > 0)
+
+    def start(self):
+        """Start sweeping in a daemon thread (once per process)"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            thread = Thread(target=self._run, name="retention", daemon=True)
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                log.exception("retention sweep failed")
+
+    def _entries(self):
+        entries = []
+        for folder in self.folders:
+            try:
+                names = os.listdir(folder)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(folder, name)
+                if name.startswith(".") or path in self.exclude:
+                    continue
+                try:
+                    mtime, size = _entry_stat(path)
+                except OSError:
+                    # Deleted while we looked
+                    continue
+                entries.append((mtime, path, folder, size))
+        entries.sort()
+        return entries
+
+    def sweep(self, now=None):
+        """Delete what is over the limits; returns the bytes reclaimed"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for *_, size in entries)
+            reclaimed = 0
+            for mtime, path, folder, size in entries:
+                age = now - mtime
+                if age < self.min_age:
+                    # Sorted oldest first, so the rest are younger still
+                    break
+                if self.max_age > 0 and age > self.max_age:
+                    reason = "age"
+                elif self.max_bytes > 0 and total > self.max_bytes:
+                    reason = "size"
+                else:
+                    continue
+                with self._pinned_lock:
+                    if path in self._pinned:
+                        continue
+                if self.remove(path, folder, reason, size):
+                    total -= size
+                    reclaimed += size
+        if reclaimed:
+            log.info("retention reclaimed %d bytes", reclaimed)
+        return reclaimed
+
+    def pin(self, path):
+        """Keep path from being swept until it is remove()d (it is in use)"""
+        with self._pinned_lock:
+            self._pinned.add(os.path.abspath(path))
+
+    def remove(self, path, folder=None, reason="consumed", size=None):
+        """Delete one file or folder now (and unpin it); True if it was deleted"""
+        with self._pinned_lock:
+            self._pinned.discard(os.path.abspath(path))
+        try:
+            if size is None:
+                size = _entry_stat(path)[1]
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            return False
+        if self.on_delete:
+            folder = folder or os.path.dirname(os.path.abspath(path))
+            self.on_delete(os.path.basename(folder), reason, size)
+        return True
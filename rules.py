@@ -0,0 +1,230 @@
+import hashlib
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+from report_sheet import ABSENT, EARLY_CHECK_OUT, LATE, NORMAL
+
+# Check-ins at or after 08:34 count as late, unless a rule sets another time
+LATE_THRESHOLD_MINUTES = 8 * 60 + 34
+
+# DayOff texts (compared case-insensitively) that mark a day off
+DAY_OFF_VALUES = ("1", "true", "yes", "y", "x")
+
+# "HH:MM", "HH:MM:SS" and "YYYY-MM-DD HH:MM:SS" check-in/out text
+CLOCK_PATTERN = r"^(?:\d{4}-\d{2}-\d{2}[ T])?([+-]?\d+)\s*:\s*([+-]?\d+)\s*(?::.*)?$"
+
+# What a rule can match on, broadest first: between rules matching as many
+# keys, the one with the narrower keys wins
+RULE_KEYS = ("branch", "department", "shift")
+
+# What a rule can set
+RULE_SETTINGS = ("late_from", "early_before", "day_off_exempt")
+
+
+def clock_minutes(text):
+    """Minutes past midnight of clock text, as floats (NaN if not a time)"""
+    parts = pd.Series(text, dtype=object).str.strip().str.extract(CLOCK_PATTERN)
+    minutes = pd.to_numeric(parts[0]) * 60 + pd.to_numeric(parts[1])
+    return minutes.to_numpy(dtype=float)
+
+
+def _normalize(value):
+    # Keys match whatever their case and spacing
+    text = " ".join(str(value).split()).upper()
+    # Number columns with blanks are read as floats: shift "2" shows as "2.0"
+    if text.endswith(".0") and text[:-2].isdigit():
+        text = text[:-2]
+    return text
+
+
+def _parse_clock(value, where):
+    if value is None:
+        return np.nan
+    try:
+        hours, minutes = (int(part) for part in str(value).split(":"))
+    except ValueError:
+        raise ValueError(f"{where}: expected a time as HH:MM, got {value!r}") from None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"{where}: {value!r} is not a time of day")
+    return float(hours * 60 + minutes)
+
+
+def _parse_settings(entry, where):
+    settings = {}
+    for name in ("late_from", "early_before"):
+        if name in entry:
+            settings[name] = _parse_clock(entry[name], f"{where} {name}")
+    if "day_off_exempt" in entry:
+        if not isinstance(entry["day_off_exempt"], bool):
+            raise ValueError(f"{where} day_off_exempt: expected true or false")
+        settings["day_off_exempt"] = entry["day_off_exempt"]
+    return settings
+
+
+def _per_row(table, department_codes, shift_codes):
+    # A setting's value for every row, or one value for all of them
+    if table.size == 1:
+        return table[0, 0]
+    return table[department_codes, shift_codes]
+
+
+class AttendanceRules:
+    """Late, early check-out and day-off rules, compiled for column lookups.
+
+    Each row gets a late cut-off (check-ins at or after it are late), an
+    optional early cut-off (check-outs before it are early) and whether a
+    day off (DayOff in day_off_values) exempts it from both and from
+    absence. config sets the defaults and lists rules, each matching a
+    branch (the upper-cased file name), department and/or shift and setting
+    any of the three; see the README for the format. Of the rules matching
+    a row, the one matching the most keys wins, then the one with the
+    narrower keys (shift, then department, then branch), then the later
+    one. Each setting is resolved on its own.
+
+    Rules are compiled into a table keyed by what they match, so resolving
+    a row's settings takes a few dict lookups however many rules there are.
+    status() resolves them once per distinct department and shift of a
+    sheet and applies them to whole columns.
+    """
+
+    def __init__(self, config=None):
+        self.configured = config is not None
+        config = dict(config or {})
+        self.shift_column = config.pop("shift_column", "Shift")
+        self.day_off_values = frozenset(
+            str(value).strip().lower()
+            for value in config.pop("day_off_values", DAY_OFF_VALUES)
+        )
+        rules = config.pop("rules", [])
+
+        defaults = {
+            "late_from": float(LATE_THRESHOLD_MINUTES),
+            "early_before": np.nan,
+            "day_off_exempt": False,
+        }
+        defaults.update(_parse_settings(config, "rules file"))
+        unknown = set(config) - set(RULE_SETTINGS)
+        if unknown:
+            raise ValueError(f"rules file: unknown settings {sorted(unknown)}")
+
+        # (branch, department, shift) with None for "any" -> settings
+        self._table = {(None, None, None): defaults}
+        for number, rule in enumerate(rules, start=1):
+            where = f"rule {number}"
+            unknown = set(rule) - set(RULE_KEYS) - set(RULE_SETTINGS)
+            if unknown:
+                raise ValueError(f"{where}: unknown fields {sorted(unknown)}")
+            # A list matches any of its values
+            choices = []
+            for name in RULE_KEYS:
+                value = rule.get(name)
+                if value is None:
+                    choices.append([None])
+                else:
+                    values = value if isinstance(value, list) else [value]
+                    choices.append([_normalize(item) for item in values])
+            settings = _parse_settings(rule, where)
+            for key in itertools.product(*choices):
+                self._table.setdefault(key, {}).update(settings)
+
+        # Key patterns in use, the one to look up first first
+        patterns = {tuple(value is not None for value in key) for key in self._table}
+        self._patterns = sorted(
+            patterns,
+            key=lambda used: (sum(used), [used[i] for i in (2, 1, 0)]),
+            reverse=True,
+        )
+        self.fingerprint = hashlib.sha256(
+            json.dumps(
+                [
+                    self.shift_column,
+                    sorted(self.day_off_values),
+                    [[list(key), settings] for key, settings in self._table.items()],
+                ],
+                default=str,
+            ).encode()
+        ).hexdigest()
+
+    @classmethod
+    def load(cls, path):
+        """Rules from a JSON file"""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _keyed(self, name):
+        position = RULE_KEYS.index(name)
+        return any(used[position] for used in self._patterns)
+
+    @property
+    def columns(self):
+        """Columns read for the rules besides the report's own"""
+        return [self.shift_column] if self._keyed("shift") else []
+
+    def resolve(self, branch, department="", shift=""):
+        """{setting: value} for a row of a branch, department and shift"""
+        values = (_normalize(branch), _normalize(department), _normalize(shift))
+        settings = {}
+        for used in self._patterns:
+            key = tuple(value if use else None for value, use in zip(values, used))
+            for name, value in self._table.get(key, {}).items():
+                settings.setdefault(name, value)
+        return settings
+
+    def _groups(self, sheet, column, name):
+        # Distinct values a setting can depend on, and each row's position
+        # in them; a single group when no rule matches on them
+        encoded = sheet.column(column) if self._keyed(name) else None
+        if encoded is None:
+            return [""], np.zeros(len(sheet), dtype=np.uint8)
+        return encoded
+
+    def status(self, sheet, branch=""):
+        """Status flags of every row of a ReportSheet from a branch's file"""
+        departments, department_codes = self._groups(
+            sheet, "DepartmentName", "department"
+        )
+        shifts, shift_codes = self._groups(sheet, self.shift_column, "shift")
+
+        # Settings per (department, shift) pair, then per row
+        tables = {
+            name: np.empty((len(departments), len(shifts)), dtype=float)
+            for name in RULE_SETTINGS
+        }
+        for i, department in enumerate(departments):
+            for j, shift in enumerate(shifts):
+                for name, value in self.resolve(branch, department, shift).items():
+                    tables[name][i, j] = value
+        rows = {
+            name: _per_row(table, department_codes, shift_codes)
+            for name, table in tables.items()
+        }
+
+        status = np.full(len(sheet), NORMAL, dtype=np.uint8)
+        absent = np.zeros(len(sheet), dtype=bool)
+        check_in = sheet.column("ActualCheckIn")
+        if check_in is not None:
+            values, codes = check_in
+            blank = np.array([not value.strip() for value in values], dtype=bool)
+            absent = blank[codes]
+            late = ~absent & (clock_minutes(values)[codes] >= rows["late_from"])
+            status[absent] = ABSENT
+            status[late] |= LATE
+
+        check_out = sheet.column("ActualCheckOut")
+        if check_out is not None and not np.isnan(tables["early_before"]).all():
+            values, codes = check_out
+            early = ~absent & (clock_minutes(values)[codes] < rows["early_before"])
+            status[early] |= EARLY_CHECK_OUT
+
+        day_off = sheet.column("DayOff")
+        if day_off is not None and tables["day_off_exempt"].any():
+            values, codes = day_off
+            off = np.array(
+                [value.strip().lower() in self.day_off_values for value in values],
+                dtype=bool,
+            )
+            status[off[codes] & (rows["day_off_exempt"] != 0)] = NORMAL
+        return status
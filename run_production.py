@@ -1,8 +1,19 @@
+import os
 import socket
 
-from app import app
+from app import LARGE_LANE_SLOTS, SMALL_LANE_SLOTS, app
 from waitress import serve
 
+# Convert a tiny sheet before serving, so the first request is not slowed
+# by imports, font loading and reportlab's first-use caches
+WARM_UP = os.environ.get("WARM_UP", "1") == "1"
+
+# Request threads; more than the admission lanes' slots together, so busy
+# answers and status polls are served while every slot is taken
+SERVER_THREADS = int(
+    os.environ.get("SERVER_THREADS", str(SMALL_LANE_SLOTS + LARGE_LANE_SLOTS + 4))
+)
+
 
 def get_local_ip():
     """Get the local IP address of the machine"""
@@ -35,8 +46,21 @@ if __name__ == "__main__":
     print("=" * 60)
     print("\n")
 
+    if WARM_UP:
+        import converter
+
+        converter.warm_up()
+
     # Start the production server with Waitress
     # - host='0.0.0.0' allows access from other computers on the network
-    # - threads=4 allows handling multiple users simultaneously
+    # - threads allows handling multiple users simultaneously
+    # - max_request_body_size rejects oversized uploads before buffering them
     # - url_scheme='http' for local network use
-    serve(app, host="0.0.0.0", port=port, threads=4, url_scheme="http")
+    serve(
+        app,
+        host="0.0.0.0",
+        port=port,
+        threads=SERVER_THREADS,
+        max_request_body_size=app.config["MAX_CONTENT_LENGTH"],
+        url_scheme="http",
+    )
@@ -0,0 +1,90 @@
+import time
+from threading import Lock
+
+
+class SheetCache:
+    """In-memory store of parsed uploads, so re-rendering one skips parsing.
+
+    Each entry holds the ReportSheets of an upload (display text and
+    absent/late status), keyed by upload id (a hash of the uploaded bytes) and
+    whether every sheet or only the first was read. Entries expire ttl
+    seconds after they were last used, and the least recently used ones are
+    evicted once their estimated size passes max_bytes. The cache lives in
+    this process only.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+        # (upload_id, all_sheets) -> [entry, size, last used], least
+        # recently used first
+        self._entries = {}
+        self._size = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def get(self, upload_id, all_sheets):
+        """(filename, sheets) of a parsed upload, or None"""
+        if not self.enabled:
+            return None
+        key = (upload_id, all_sheets)
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            item = self._entries.pop(key, None)
+            if item is None:
+                self.misses += 1
+                return None
+            # Mark as most recently used
+            item[2] = now
+            self._entries[key] = item
+            self.hits += 1
+            return item[0]
+
+    def put(self, upload_id, all_sheets, filename, sheets):
+        """Keep the parsed sheets of an upload, evicting old entries"""
+        if not self.enabled:
+            return
+        size = sum(sheet.nbytes for _, sheet in sheets)
+        if size > self.max_bytes:
+            return
+        key = (upload_id, all_sheets)
+        now = time.monotonic()
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = [(filename, sheets), size, now]
+            self._size += size
+            self._prune(now)
+            while self._size > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._size -= self._entries.pop(old_key)[1]
+                self.evictions += 1
+
+    def _prune(self, now):
+        # Oldest entries come first, so stop at the first one still fresh
+        cutoff = now - self.ttl
+        while self._entries:
+            key = next(iter(self._entries))
+            if self._entries[key][2] >= cutoff:
+                break
+            self._size -= self._entries.pop(key)[1]
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+            }
@@ -6,9 +6,13 @@ const resultDiv = document.getElementById("result");
 const modeBtns = document.querySelectorAll(".mode-btn");
 const stepTitle = document.getElementById("step-title");
 const submitBtn = document.getElementById("submit-btn");
+const summaryGroup = document.getElementById("summary-group");
 
 let currentMode = "single";
 
+// Times a conversion is resubmitted while the server answers "busy"
+const MAX_BUSY_RETRIES = 5;
+
 // Mode selection
 modeBtns.forEach((btn) => {
   btn.addEventListener("click", () => {
@@ -24,6 +28,7 @@ modeBtns.forEach((btn) => {
       fileInput.setAttribute("webkitdirectory", "webkitdirectory");
       fileInput.setAttribute("directory", "directory");
       submitBtn.textContent = "Convert All to PDF";
+      summaryGroup.classList.remove("hidden");
     } else {
       stepTitle.textContent = "Step 1: Upload Excel File";
       dropZone.textContent =
@@ -32,6 +37,7 @@ modeBtns.forEach((btn) => {
       fileInput.removeAttribute("directory");
       fileInput.removeAttribute("multiple");
       submitBtn.textContent = "Convert to PDF";
+      summaryGroup.classList.add("hidden");
     }
 
     // Reset file input and UI
@@ -139,6 +145,8 @@ form.addEventListener("submit", async (e) => {
         formData.append("files[]", file);
       }
     }
+    const summary = document.getElementById("batch-summary").checked;
+    formData.append("summary", summary ? "1" : "0");
   } else {
     // Single mode - add only the first file
     formData.append("file", files[0]);
@@ -147,49 +155,94 @@ form.addEventListener("submit", async (e) => {
 
   formData.append("subtitle", document.getElementById("subtitle").value);
   formData.append("report_date", document.getElementById("report-date").value);
+  formData.append("sheet_mode", document.getElementById("sheet-mode").value);
+  if (document.getElementById("fast-render").checked) {
+    formData.append("render_mode", "fast");
+  }
 
   resultDiv.innerHTML =
     "<p class='loading'>Converting to PDF... Please wait...</p>";
 
   try {
-    const endpoint = currentMode === "batch" ? "/batch-convert" : "/convert";
-    const response = await fetch(endpoint, {
-      method: "POST",
-      body: formData,
-    });
+    const endpoint =
+      currentMode === "batch" ? "/jobs/batch-convert" : "/jobs/convert";
+    const response = await submitWhenAdmitted(endpoint, formData);
 
-    if (response.ok) {
-      // Get filename from response headers
-      const contentDisposition = response.headers.get("Content-Disposition");
-      let filename = "download.pdf";
+    if (!response.ok) {
+      const error = await response.json();
+      resultDiv.innerHTML = `<p class='error'>Error: ${error.error}</p>`;
+      return;
+    }
 
-      if (contentDisposition) {
-        const filenameMatch = contentDisposition.match(/filename="?(.+?)"?$/);
-        if (filenameMatch && filenameMatch[1]) {
-          filename = filenameMatch[1].replace(/"/g, "");
-        }
+    // The conversion runs in the background; poll until it finishes
+    let job = await response.json();
+    const statusUrl = job.status_url;
+    const resultUrl = job.result_url;
+    while (job.status === "queued" || job.status === "running") {
+      showProgress(job);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      const statusResponse = await fetch(statusUrl);
+      job = await statusResponse.json();
+      if (!statusResponse.ok) {
+        resultDiv.innerHTML = `<p class='error'>Error: ${job.error}</p>`;
+        return;
       }
+    }
 
-      const blob = await response.blob();
-      const url = window.URL.createObjectURL(blob);
-      const a = document.createElement("a");
-      a.href = url;
-      a.download = filename;
+    if (job.status === "failed") {
+      resultDiv.innerHTML = `<p class='error'>Error: ${job.error}</p>`;
+      return;
+    }
 
-      if (currentMode === "batch") {
-        a.textContent = "📥 Download All PDFs (ZIP)";
-      } else {
-        a.textContent = "📥 Download PDF";
-      }
+    const a = document.createElement("a");
+    a.href = resultUrl;
+    a.download = job.result_filename;
 
-      a.className = "download-link";
-      resultDiv.innerHTML = "";
-      resultDiv.appendChild(a);
+    if (currentMode === "batch") {
+      a.textContent = "📥 Download All PDFs (ZIP)";
     } else {
-      const error = await response.json();
-      resultDiv.innerHTML = `<p class='error'>Error: ${error.error}</p>`;
+      a.textContent = "📥 Download PDF";
+    }
+
+    a.className = "download-link";
+    resultDiv.innerHTML = "";
+    resultDiv.appendChild(a);
+
+    if (job.errors.length) {
+      const skipped = document.createElement("p");
+      skipped.className = "error";
+      skipped.textContent = `Skipped: ${job.errors.join("; ")}`;
+      resultDiv.appendChild(skipped);
     }
   } catch (error) {
     resultDiv.innerHTML = `<p class='error'>Error converting file(s): ${error.message}</p>`;
   }
 });
+
+// A busy server answers 429/503 with Retry-After; wait and resubmit
+async function submitWhenAdmitted(endpoint, formData) {
+  for (let attempt = 0; ; attempt++) {
+    const response = await fetch(endpoint, {
+      method: "POST",
+      body: formData,
+    });
+    const busy = response.status === 429 || response.status === 503;
+    if (!busy || attempt >= MAX_BUSY_RETRIES) {
+      return response;
+    }
+    const seconds = parseInt(response.headers.get("Retry-After"), 10) || 5;
+    resultDiv.innerHTML = `<p class='loading'>Server busy, retrying in ${seconds}s...</p>`;
+    await new Promise((resolve) => setTimeout(resolve, seconds * 1000));
+  }
+}
+
+function showProgress(job) {
+  const progress = document.createElement("p");
+  progress.className = "loading";
+  progress.textContent = `Converting to PDF... ${job.done}/${job.total} file(s) done`;
+  if (job.current_file) {
+    progress.textContent += ` (current: ${job.current_file})`;
+  }
+  resultDiv.innerHTML = "";
+  resultDiv.appendChild(progress);
+}
@@ -0,0 +1,36 @@
+import zipfile
+
+
+class ZipStream:
+    """Write-only file object that hands back ZIP bytes as they are written"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive chunk by chunk from (arcname, data) pairs.
+
+    Each entry is sent on as soon as it is added, so only the entry being
+    written is held in memory. The archive is written without seeking
+    (sizes go in data descriptors), which every unzip tool understands.
+    """
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, "w") as zipf:
+        for arcname, data in entries:
+            zipf.writestr(arcname, data)
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()